@@ -5,16 +5,20 @@ Generate strategic analysis of payoff patterns and actor behavior.
 
 from __future__ import annotations
 
+import logging
 import os
 from typing import List, Dict, Any
 
-from langchain_openai import ChatOpenAI
+from langchain_core.language_models import BaseChatModel
 from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import PydanticOutputParser
+from api.openai.llm_backend import get_chat_model, get_shared
 from pydantic import BaseModel, Field
 
 from api.openai.infer_payoffs import ActorEntry
 
+logger = logging.getLogger(__name__)
+
 
 class StrategyAnalysis(BaseModel):
     strategy_id: str = Field(description="Strategy ID (e.g., 'CG-1')")
@@ -84,21 +88,22 @@ For each strategy, consider:
 """
 
 
-def _get_llm() -> ChatOpenAI:
-    return ChatOpenAI(
-        model_name="gpt-4o-mini",
-        temperature=0.3,
-        openai_api_key=os.getenv("OPENAI_API_KEY"),
-    )
+def _get_llm(refresh: bool = False) -> BaseChatModel:
+    # A refreshing cache skips the cached response, for retries
+    return get_chat_model("payoff_analysis", "gpt-4o-mini", temperature=0.3, refresh=refresh)
 
 
 def _get_parser() -> PydanticOutputParser:
     return PydanticOutputParser(pydantic_object=PayoffAnalysisResponse)
 
 
-def _get_analysis_chain():
-    """Return an LLM chain for payoff analysis."""
-    llm = _get_llm()
+def _get_analysis_chain(refresh: bool = False):
+    """Return an LLM chain for payoff analysis, built once per process and shared."""
+    return get_shared(("payoff_analysis_chain", refresh), lambda: _build_analysis_chain(refresh))
+
+
+def _build_analysis_chain(refresh: bool):
+    llm = _get_llm(refresh)
     parser = _get_parser()
     prompt = ChatPromptTemplate.from_template(
         _ANALYSIS_PROMPT,
@@ -125,33 +130,41 @@ def format_payoffs_for_analysis(actors: List[ActorEntry]) -> str:
     return "\n".join(formatted_data)
 
 
-def analyze_payoffs(problem_description: str, actors: List[ActorEntry], system_objective: str = "the social problem") -> PayoffAnalysisResponse:
+def analyze_payoffs(problem_description: str, actors: List[ActorEntry], system_objective: str = "the social problem",
+                    max_attempts: int = 3) -> PayoffAnalysisResponse:
     """
     Generate strategic analysis of payoff patterns.
+
+    A response that fails to parse is retried up to `max_attempts` times;
+    retries bypass the cached response.
     """
-    chain = _get_analysis_chain()
-    
     try:
         payoffs_data = format_payoffs_for_analysis(actors)
         
-        print(f"Analyzing payoffs for {len(actors)} actors...")
-        print(f"Sending data: {payoffs_data[:200]}...")  # Debug print
+        logger.info("Analyzing payoffs for %d actors", len(actors))
+        logger.debug("Sending data: %s...", payoffs_data[:200])
         
-        result = chain.invoke({
-            "problem_description": problem_description,
-            "system_objective": system_objective,
-            "payoffs_data": payoffs_data
-        })
+        for attempt in range(max_attempts):
+            try:
+                result = _get_analysis_chain(refresh=attempt > 0).invoke({
+                    "problem_description": problem_description,
+                    "system_objective": system_objective,
+                    "payoffs_data": payoffs_data
+                })
+                break
+            except ValueError as e:
+                # Parser errors: a bad response is cached like any other, so the retry must skip it
+                if attempt == max_attempts - 1:
+                    raise
+                logger.warning("Payoff analysis attempt %d of %d failed: %s", attempt + 1, max_attempts, e)
         
-        print(f"Generated analysis with {len(result.strategy_analyses)} strategy analyses")
+        logger.info("Generated analysis with %d strategy analyses", len(result.strategy_analyses))
         
         # Return the result directly, not wrapped in a container
         return result
         
-    except Exception as e:
-        print(f"Error in payoff analysis: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Error in payoff analysis")
         # Return simple response with empty analysis on error
         return PayoffAnalysisResponse(
             strategy_analyses=[]
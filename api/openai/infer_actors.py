@@ -1,12 +1,15 @@
 # filepath: /Users/joeheapy/Documents/EvoSocialOne/api/openai/infer_actors.py
+import logging
 import os
 from typing import List, Dict
 import openai
-from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.output_parsers import PydanticOutputParser
+from api.openai.llm_backend import get_chat_model, uses_fake_backend
 from pydantic import BaseModel, Field, validator
 
+logger = logging.getLogger(__name__)
+
 # Define a dedicated Strategy model for better validation
 class Strategy(BaseModel):
     id: str = Field(description="Strategy ID in the format '[actorID-index]' (e.g., 'CG-1')")
@@ -33,18 +36,22 @@ class ActorEntry(BaseModel):
 class ActorsTable(BaseModel):
     actors: List[ActorEntry] = Field(description="A list of key UK organisations and actors relevant to the problem.")
 
-def infer_actors_from_problem(problem_description: str) -> ActorsTable | None:
+def infer_actors_from_problem(problem_description: str, max_attempts: int = 3) -> ActorsTable | None:
     """
     Uses LangChain and OpenAI to infer actors from a problem description.
     Returns an ActorsTable object or None if an error occurs.
+
+    A response that fails to parse or validate is retried up to `max_attempts`
+    times; retries bypass the cached response (see get_llm_cache).
     """
-    # Ensure API key is available
-    if not os.getenv("OPENAI_API_KEY"):
-        print("Error: OPENAI_API_KEY environment variable not set.")
-        return None
+    # Ensure API key is available (the offline backend needs none)
+    if not uses_fake_backend():
+        if not os.getenv("OPENAI_API_KEY"):
+            logger.error("OPENAI_API_KEY environment variable not set.")
+            return None
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    print(f"API key starts with: {api_key[:5]}... and is {len(api_key)} characters long")
+        api_key = os.getenv("OPENAI_API_KEY")
+        logger.debug("API key starts with: %s... and is %d characters long", api_key[:5], len(api_key))
 
     try:
         # Clear any proxy settings that might be interfering
@@ -52,12 +59,6 @@ def infer_actors_from_problem(problem_description: str) -> ActorsTable | None:
             if env_var in os.environ:
                 del os.environ[env_var]
         
-        # Use direct initialization with only the required parameters
-        llm = ChatOpenAI(
-            model_name="gpt-3.5-turbo",
-            temperature=0,
-            openai_api_key=api_key
-        )
         parser = PydanticOutputParser(pydantic_object=ActorsTable)
 
         prompt_template = """
@@ -117,49 +118,54 @@ def infer_actors_from_problem(problem_description: str) -> ActorsTable | None:
             input_variables=["problem_description"], 
             partial_variables={"format_instructions": parser.get_format_instructions()} 
         ) 
-        chain = prompt | llm | parser
 
-        print("\n--- CALLING LANGCHAIN/OPENAI FOR ACTOR INFERENCE ---") 
-        print(f"Problem: {problem_description}")
+        logger.info("Calling LangChain/OpenAI for actor inference")
+        logger.debug("Problem: %s", problem_description)
         
         try:
-            # Separate try block for the API call specifically
-            actors_table_data = chain.invoke({"problem_description": problem_description})
+            for attempt in range(max_attempts):
+                # Chat model from the configured backend (see llm_backend.py);
+                # retries bypass the cached response that just failed
+                llm = get_chat_model("actors", "gpt-3.5-turbo", temperature=0, refresh=attempt > 0)
+                chain = prompt | llm | parser
+                try:
+                    actors_table_data = chain.invoke({"problem_description": problem_description})
+                    
+                    # Validate minimum number of actors
+                    if len(actors_table_data.actors) < 6:
+                        raise ValueError(f"Only {len(actors_table_data.actors)} actors were identified. At least 6 are required.")
+                    
+                    # Validate that all actors have exactly 3 strategies
+                    for actor in actors_table_data.actors:
+                        if len(actor.strategies) != 3:
+                            raise ValueError(f"Actor {actor.sector} has {len(actor.strategies)} strategies instead of 3")
+                except ValueError as e:
+                    # Parser and validation errors; API errors are handled below
+                    logger.warning("Actor inference attempt %d of %d failed: %s", attempt + 1, max_attempts, e)
+                    continue
+                
+                logger.debug("LangChain/OpenAI response (parsed): %s", actors_table_data)
+                return actors_table_data
             
-            # Validate minimum number of actors
-            if len(actors_table_data.actors) < 6:
-                print(f"Error: Only {len(actors_table_data.actors)} actors were identified. At least 6 are required.")
-                return None
-            
-            # Validate that all actors have exactly 3 strategies
-            for actor in actors_table_data.actors:
-                if len(actor.strategies) != 3:
-                    print(f"Error: Actor {actor.sector} has {len(actor.strategies)} strategies instead of 3")
-                    return None
-            
-            print("--- LANGCHAIN/OPENAI RESPONSE (PARSED) ---") 
-            print(actors_table_data) 
-            print("------------------------------------------\n")
-            return actors_table_data
+            logger.error("Actor inference failed after %d attempts", max_attempts)
+            return None
             
         except openai.RateLimitError as e:
-            print(f"OpenAI API rate limit exceeded: {e}")
+            logger.error("OpenAI API rate limit exceeded: %s", e)
             return None
         except openai.AuthenticationError as e:
-            print(f"OpenAI API authentication error - check your API key: {e}")
+            logger.error("OpenAI API authentication error - check your API key: %s", e)
             return None
         except openai.APITimeoutError as e:
-            print(f"OpenAI API request timed out: {e}")
+            logger.error("OpenAI API request timed out: %s", e)
             return None
         except openai.BadRequestError as e:
-            print(f"Bad request to OpenAI API: {e}")
+            logger.error("Bad request to OpenAI API: %s", e)
             return None
         except openai.APIConnectionError as e:
-            print(f"Failed to connect to OpenAI API: {e}")
+            logger.error("Failed to connect to OpenAI API: %s", e)
             return None
             
     except Exception as e: 
-        print(f"Error during actor inference: {type(e).__name__}: {str(e)}") 
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error during actor inference: %s: %s", type(e).__name__, e)
         return None
\ No newline at end of file
@@ -6,18 +6,22 @@ Behavior shares must sum to 1.0 for each actor and no strategy can have 0% share
 
 from __future__ import annotations
 
+import logging
 import os
 from typing import List
 import json
 
-from langchain_openai import ChatOpenAI
+from langchain_core.language_models import BaseChatModel
 from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import PydanticOutputParser
+from api.openai.llm_backend import get_chat_model, get_shared
 from pydantic import BaseModel, Field
 
 # Import the existing models from infer_payoffs - no need to extend them now
 from api.openai.infer_payoffs import Strategy, ActorEntry
 
+logger = logging.getLogger(__name__)
+
 class BehaviorSharesResponse(BaseModel):
     actors: List[ActorEntry] = Field(description="List of actors with behavior share data")
 
@@ -91,20 +95,20 @@ Return the result in this exact format:
 {format_instructions}
 """
 
-# LangChain helpers
-def _get_llm() -> ChatOpenAI:
-    return ChatOpenAI(
-        model_name="gpt-4o",  # Using gpt-4o which has internet access
-        temperature=0.1,
-        openai_api_key=os.getenv("OPENAI_API_KEY"),
-    )
+# LangChain helpers, built once per process and shared (see llm_backend.get_shared)
+def _get_llm(refresh: bool = False) -> BaseChatModel:
+    # Using gpt-4o which has internet access; a refreshing cache skips the cached response on retries
+    return get_chat_model("behavior_shares", "gpt-4o", temperature=0.1, refresh=refresh)
 
 def _get_parser() -> PydanticOutputParser:
     return PydanticOutputParser(pydantic_object=BehaviorSharesResponse)
 
-def _get_behavior_shares_chain():
+def _get_behavior_shares_chain(refresh: bool = False):
     """Return an LLM chain that estimates behavior shares."""
-    llm = _get_llm()
+    return get_shared(("behavior_shares_chain", refresh), lambda: _build_behavior_shares_chain(refresh))
+
+def _build_behavior_shares_chain(refresh: bool):
+    llm = _get_llm(refresh)
     parser = _get_parser()
     prompt = ChatPromptTemplate.from_template(
         _BEHAVIOR_SHARES_PROMPT,
@@ -113,7 +117,8 @@ def _get_behavior_shares_chain():
     return prompt | llm | parser
 
 # Public API
-def infer_behavior_shares(problem_description: str, actors_with_payoffs: List[ActorEntry], epoch: int = 0) -> List[ActorEntry]:
+def infer_behavior_shares(problem_description: str, actors_with_payoffs: List[ActorEntry], epoch: int = 0,
+                          max_attempts: int = 3) -> List[ActorEntry]:
     """
     Parameters
     ----------
@@ -123,6 +128,8 @@ def infer_behavior_shares(problem_description: str, actors_with_payoffs: List[Ac
         Actors with payoff data already calculated.
     epoch : int
         The time epoch (currently only supports epoch 0).
+    max_attempts : int
+        Tries when a response fails to parse; retries bypass the cached response.
 
     Returns
     -------
@@ -130,60 +137,47 @@ def infer_behavior_shares(problem_description: str, actors_with_payoffs: List[Ac
         Actors with behavior_share_epoch_0 added to each strategy.
     """
     
-    # Debug: Check input data
-    print(f"DEBUG: Received {len(actors_with_payoffs)} actors for behavior shares")
-    for i, actor in enumerate(actors_with_payoffs):
-        print(f"DEBUG: Actor {i}: {actor.actor_id}, strategies: {len(actor.strategies)}")
-        for j, strategy in enumerate(actor.strategies):
-            current_share = getattr(strategy, 'behavior_share_epoch_0', None)
-            print(f"DEBUG: Strategy {j}: {strategy.id}, current behavior_share: {current_share}")
+    if logger.isEnabledFor(logging.DEBUG):
+        for actor in actors_with_payoffs:
+            logger.debug("Input actor %s: %s", actor.actor_id,
+                         [(strategy.id, strategy.behavior_share_epoch_0) for strategy in actor.strategies])
     
     # Convert actors to JSON for the prompt
     actors_json = json.dumps([actor.model_dump() for actor in actors_with_payoffs], indent=2)
     
-    chain = _get_behavior_shares_chain()
-    
     try:
-        print(f"Sending behavior shares request to OpenAI for {len(actors_with_payoffs)} actors...")
-        result = chain.invoke({
-            "problem_description": problem_description,
-            "actors_json": actors_json
-        })
-        print(f"Received behavior shares from OpenAI: {len(result.actors) if result and result.actors else 0} actors")
+        logger.info("Sending behavior shares request to OpenAI for %d actors", len(actors_with_payoffs))
+        for attempt in range(max_attempts):
+            try:
+                result = _get_behavior_shares_chain(refresh=attempt > 0).invoke({
+                    "problem_description": problem_description,
+                    "actors_json": actors_json
+                })
+                break
+            except ValueError as e:
+                # Parser errors: a bad response is cached like any other, so the retry must skip it
+                if attempt == max_attempts - 1:
+                    raise
+                logger.warning("Behavior shares attempt %d of %d failed: %s", attempt + 1, max_attempts, e)
+        logger.info("Received behavior shares from OpenAI: %d actors", len(result.actors) if result and result.actors else 0)
         
         if result and result.actors:
-            # Debug: Check output data
-            print("DEBUG: Behavior shares results:")
-            for i, actor in enumerate(result.actors):
-                print(f"DEBUG: Actor {i}: {actor.actor_id}")
-                total_share = 0
-                for j, strategy in enumerate(actor.strategies):
-                    share = getattr(strategy, 'behavior_share_epoch_0', None)
-                    if share is not None:
-                        total_share += share
-                    print(f"DEBUG: Strategy {j}: {strategy.id}, behavior_share: {share}")
-                print(f"DEBUG: Total share for {actor.actor_id}: {total_share}")
-            
             # Validate that behavior shares sum to 1.0 for each actor
             for actor in result.actors:
-                total_share = 0
-                for strategy in actor.strategies:
-                    share = getattr(strategy, 'behavior_share_epoch_0', None)
-                    if share is not None:
-                        total_share += share
+                shares = [strategy.behavior_share_epoch_0 for strategy in actor.strategies]
+                total_share = sum(share for share in shares if share is not None)
+                logger.debug("Behavior shares for %s: %s (total %s)", actor.actor_id, shares, total_share)
                 
                 if abs(total_share - 1.0) > 0.001:  # Allow small floating point errors
-                    print(f"Warning: Actor {actor.actor_id} behavior shares sum to {total_share:.3f}, not 1.000")
+                    logger.warning("Actor %s behavior shares sum to %.3f, not 1.000", actor.actor_id, total_share)
             
             return result.actors
         else:
-            print("DEBUG: No result or no actors in result")
+            logger.warning("Behavior shares chain returned no actors")
             return actors_with_payoffs
             
-    except Exception as e:
-        print(f"Error in behavior shares chain: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Error in behavior shares chain")
         return actors_with_payoffs
 
 # Example CLI usage (can be zapped later)
@@ -1,15 +1,18 @@
 # filepath: /Users/joeheapy/Documents/EvoSocialOne/api/openai/infer_outcome_target.py
+import logging
 import os
 from typing import List, Dict, Union
 import openai
-from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field, validator, ValidationError
 from config import SOURCES_OF_UK_SOCIAL_DATA
+from api.openai.llm_backend import get_chat_model, uses_fake_backend
 import json
 import re
 
+logger = logging.getLogger(__name__)
+
 # Define the Pydantic model for the outcome target
 class OutcomeTarget(BaseModel):
     metric_name: str = Field(description="A concise label for the outcome")
@@ -72,12 +75,10 @@ class CustomJSONOutputParser:
             return self.pydantic_object(**parsed_json)
             
         except json.JSONDecodeError as e:
-            print(f"JSON parsing error: {e}")
-            print(f"Attempted to parse: {json_str[:200]}...")
+            logger.warning("JSON parsing error: %s; attempted to parse: %s...", e, json_str[:200])
             raise ValueError(f"Invalid JSON format: {e}")
         except Exception as e:
-            print(f"Parsing error: {e}")
-            print(f"Raw response: {text[:500]}...")
+            logger.warning("Parsing error: %s; raw response: %s...", e, text[:500])
             raise ValueError(f"Failed to parse response: {e}")
     
     def get_format_instructions(self):
@@ -109,30 +110,30 @@ def infer_outcome_targets_from_problem(problem_description: str) -> OutcomeTarge
     Uses LangChain and OpenAI to infer outcome targets from a problem description.
     Returns an OutcomeTargets object or None if an error occurs.
     """
-    # Ensure API key is available
-    if not os.getenv("OPENAI_API_KEY"):
-        print("Error: OPENAI_API_KEY environment variable not set.")
-        return None
+    # Ensure API key is available (the offline backend needs none)
+    if not uses_fake_backend():
+        if not os.getenv("OPENAI_API_KEY"):
+            logger.error("OPENAI_API_KEY environment variable not set.")
+            return None
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    print(f"API key starts with: {api_key[:5]}... and is {len(api_key)} characters long")
+        api_key = os.getenv("OPENAI_API_KEY")
+        logger.debug("API key starts with: %s... and is %d characters long", api_key[:5], len(api_key))
 
     max_attempts = 3
     for attempt in range(max_attempts):
         try:
-            print(f"\n--- ATTEMPT {attempt + 1} OF {max_attempts} ---")
+            logger.info("Outcome targets attempt %d of %d", attempt + 1, max_attempts)
             
             # Clear any proxy settings that might be interfering
             for env_var in ['HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy']:
                 if env_var in os.environ:
                     del os.environ[env_var]
             
-            # Use ChatOpenAI with web search enabled
-            llm = ChatOpenAI(
-                model="gpt-4o",
-                temperature=0.2,
-                openai_api_key=api_key,
-                max_retries=1
+            # Chat model from the configured backend (see llm_backend.py)
+            llm = get_chat_model(
+                "outcome_targets", "gpt-4o", temperature=0.2, max_retries=1,
+                # Retries bypass the cached response that just failed to parse
+                refresh=attempt > 0
             )
             
             # Use our custom parser
@@ -177,7 +178,7 @@ def infer_outcome_targets_from_problem(problem_description: str) -> OutcomeTarge
                 }
             )
             
-            print(f"Problem: {problem_description}")
+            logger.debug("Problem: %s", problem_description)
             
             # Get response from LLM
             response = llm.invoke(prompt.format(problem_description=problem_description))
@@ -188,8 +189,7 @@ def infer_outcome_targets_from_problem(problem_description: str) -> OutcomeTarge
             else:
                 response_text = str(response)
             
-            print(f"Raw response length: {len(response_text)} characters")
-            print(f"Response preview: {response_text[:200]}...")
+            logger.debug("Raw response length: %d characters, preview: %s...", len(response_text), response_text[:200])
             
             # Parse the response
             outcome_targets_data = parser.parse(response_text)
@@ -212,37 +212,31 @@ def infer_outcome_targets_from_problem(problem_description: str) -> OutcomeTarge
                 ]):
                     raise ValueError(f"Target {i+1} missing required fields")
             
-            print("--- SUCCESSFUL PARSING ---")
-            print(f"Successfully parsed {len(outcome_targets_data.targets)} targets")
+            logger.info("Successfully parsed %d targets", len(outcome_targets_data.targets))
             for i, target in enumerate(outcome_targets_data.targets):
-                print(f"Target {i+1}: {target.metric_name}")
-                print(f"  From: {target.from_value} {target.from_unit}")
-                print(f"  To: {target.to_value} {target.to_unit}")
-                print(f"  Timeframe: {target.timeframe_years} years")
-                print(f"  Sources: {len(target.sources)} provided")
-            print("---------------------------\n")
+                logger.debug("Target %d: %s, from %s %s to %s %s in %s years, %d sources", i + 1, target.metric_name,
+                             target.from_value, target.from_unit, target.to_value, target.to_unit,
+                             target.timeframe_years, len(target.sources))
             
             return outcome_targets_data
             
         except ValidationError as e:
-            print(f"Validation error on attempt {attempt + 1}: {e}")
+            logger.warning("Validation error on attempt %d: %s", attempt + 1, e)
             if attempt == max_attempts - 1:
-                print("All validation attempts failed")
+                logger.error("All validation attempts failed")
                 return None
             continue
             
         except (openai.RateLimitError, openai.AuthenticationError, 
                 openai.APITimeoutError, openai.BadRequestError, 
                 openai.APIConnectionError) as e:
-            print(f"OpenAI API error: {type(e).__name__}: {e}")
+            logger.error("OpenAI API error: %s: %s", type(e).__name__, e)
             return None
         
         except Exception as e:
-            print(f"Error on attempt {attempt + 1}: {type(e).__name__}: {str(e)}")
+            logger.warning("Error on attempt %d: %s: %s", attempt + 1, type(e).__name__, e)
             if attempt == max_attempts - 1:
-                print("All attempts failed")
-                import traceback
-                traceback.print_exc()
+                logger.exception("All attempts failed")
                 return None
             continue
     
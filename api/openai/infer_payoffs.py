@@ -3,20 +3,41 @@ infer_payoffs.py
 Generate Δ-effect, private cost, and overall payoff for every
 (actor, strategy) tuple produced by the earlier `identify_actors` step.
 
-The file exposes one public function:
+The file exposes two public functions:
     infer_payoffs(problem_description: str, actors_json: str) -> List[ActorEntry]
+    iter_payoffs(problem_description: str, actors_json: str) -> Iterator[ActorEntry]
+    payoffs_cached(problem_description: str, actors_json: str) -> bool
+
+Actors are sent in chunks of `chunk_size` per prompt, so the response size
+(and the output-token limit) does not grow with the number of actors. Chunks
+are requested concurrently, and only the chunks whose response fails to parse
+or does not match the actors sent are retried.
+
+`iter_payoffs` makes one streamed call instead and yields each actor as soon
+as its JSON object is complete, so callers can show rows while the model is
+still writing the rest. Its response is cached under the same key as
+`infer_payoffs` with every actor in one chunk; `payoffs_cached` says whether
+that response is there.
 """
 
 from __future__ import annotations
 
+import json
+import logging
 import os
-from typing import List
+from typing import Dict, Iterator, List, Optional
 
-from langchain_openai import ChatOpenAI
+from langchain_core.language_models import BaseChatModel
 from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import PydanticOutputParser
+from api.openai.json_stream import JSONArrayItemParser
+from api.openai.llm_backend import get_chat_model, get_shared
+from api.openai.llm_cache import lookup_response, store_response
+from config import LLM_MAX_CONCURRENCY, PAYOFFS_CHUNK_SIZE
 from pydantic import BaseModel, Field
 
+logger = logging.getLogger(__name__)
+
 # Data models – Strategy now has weight instead of payoff
 class Strategy(BaseModel):
     id: str = Field(description="Strategy ID in the format '[actorID-index]' (e.g., 'CG-1')")
@@ -148,28 +169,48 @@ Return the result as a JSON object with an "actors" field containing the array o
 """
 
 # LangChain helpers
-def _get_llm() -> ChatOpenAI:
-    return ChatOpenAI(
-        model_name="gpt-4o-mini",
-        temperature=0.1,
-        openai_api_key=os.getenv("OPENAI_API_KEY"),
-    )
+# Built once per process and shared (see llm_backend.get_shared)
+def _get_llm(refresh: bool = False) -> BaseChatModel:
+    # A refreshing cache skips cached responses, so a retried chunk does not get the same bad answer back
+    return get_chat_model("payoffs", "gpt-4o-mini", temperature=0.1, refresh=refresh)
 
 def _get_parser() -> PydanticOutputParser:
-    return PydanticOutputParser(pydantic_object=PayoffsResponse)
+    return get_shared("payoffs_parser", lambda: PydanticOutputParser(pydantic_object=PayoffsResponse))
 
-def _get_payoff_chain():
-    """Return an LLM chain that maps actors → payoffs."""
-    llm = _get_llm()
-    parser = _get_parser()
-    prompt = ChatPromptTemplate.from_template(
+def _get_prompt() -> ChatPromptTemplate:
+    return get_shared("payoffs_prompt", lambda: ChatPromptTemplate.from_template(
         _PAYOFF_PROMPT,
-        partial_variables={"format_instructions": parser.get_format_instructions()}
-    )
-    return prompt | llm | parser
+        partial_variables={"format_instructions": _get_parser().get_format_instructions()}
+    ))
+
+def _get_payoff_chain(refresh: bool = False):
+    """Return an LLM chain that maps actors → payoffs."""
+    return get_shared(("payoffs_chain", refresh), lambda: _get_prompt() | _get_llm(refresh) | _get_parser())
+
+def _payoff_inputs(problem_description: str, system_objective: str, actors: List[Dict]) -> Dict:
+    return {
+        "problem_description": problem_description,
+        "system_objective": system_objective,
+        "actors_block": json.dumps(actors, indent=2)
+    }
+
+def _payoff_messages(problem_description: str, actors_json: str, system_objective: str):
+    """The rendered prompt for all the actors in `actors_json` at once."""
+    inputs = _payoff_inputs(problem_description, system_objective, json.loads(actors_json))
+    return _get_prompt().invoke(inputs).to_messages()
+
+def _check_chunk(result, chunk: List[Dict]) -> List[ActorEntry]:
+    """The chunk's actors from a parsed response; raises if they do not match the actors sent."""
+    sent = [actor.get("actor_id") for actor in chunk]
+    received = [actor.actor_id for actor in result.actors] if result and result.actors else []
+    if received != sent:
+        raise ValueError(f"Expected actors {sent}, got {received}")
+    return result.actors
 
 # Public API
-def infer_payoffs(problem_description: str, actors_json: str, system_objective: str = "the social problem") -> List[ActorEntry]:
+def infer_payoffs(problem_description: str, actors_json: str, system_objective: str = "the social problem",
+                  chunk_size: int = PAYOFFS_CHUNK_SIZE, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                  max_attempts: int = 3) -> List[ActorEntry]:
     """
     Parameters
     ----------
@@ -179,38 +220,102 @@ def infer_payoffs(problem_description: str, actors_json: str, system_objective:
         The raw JSON (list of ActorEntry) returned by that step.
     system_objective : str
         The selected system objective/target metric.
+    chunk_size : int
+        Actors per prompt.
+    max_concurrency : int
+        Chunks requested at the same time.
+    max_attempts : int
+        Tries per chunk; failed chunks are retried together, the rest are kept.
 
     Returns
     -------
     List[ActorEntry]
         Actors with `delta`, `private_cost`, `weight`, and calculated `payoff_epoch_0`
-        for each of their three strategies.
+        for each of their three strategies, in input order. Empty if any chunk
+        still fails after `max_attempts`.
     """
-    chain = _get_payoff_chain()
-    
     try:
-        print(f"Sending to OpenAI:\n{actors_json[:500]}...")  # Debug print
-        result = chain.invoke({
-            "problem_description": problem_description,
-            "system_objective": system_objective,
-            "actors_block": actors_json
-        })
-        print(f"Received from OpenAI: {len(result.actors) if result and result.actors else 0} actors")  # Debug print
-        
-        # Calculate payoffs using the algorithm from pay-off-formula.md
-        if result and result.actors:
-            from maths.calculate_payoffs import process_payoffs_data
-            _, _, updated_actors = process_payoffs_data(result.actors)
-            return updated_actors
-        else:
-            return []
-            
-    except Exception as e:
-        print(f"Error in payoffs chain: {e}")
-        import traceback
-        traceback.print_exc()
+        actors = json.loads(actors_json)
+    except json.JSONDecodeError as e:
+        logger.error("Error in payoffs chain: actors JSON is invalid: %s", e)
+        return []
+    if not actors:
+        return []
+
+    chunk_size = max(1, chunk_size)
+    chunks = [actors[i:i + chunk_size] for i in range(0, len(actors), chunk_size)]
+    inputs = [_payoff_inputs(problem_description, system_objective, chunk) for chunk in chunks]
+    chunk_results: List[Optional[List[ActorEntry]]] = [None] * len(chunks)
+
+    logger.info("Sending %d actors to OpenAI in %d chunks of up to %d", len(actors), len(chunks), chunk_size)
+    todo = list(range(len(chunks)))
+    for attempt in range(max_attempts):
+        chain = _get_payoff_chain(refresh=attempt > 0)
+        outputs = chain.batch([inputs[i] for i in todo], config={"max_concurrency": max_concurrency},
+                              return_exceptions=True)
+        failed = []
+        for i, output in zip(todo, outputs):
+            try:
+                if isinstance(output, Exception):
+                    raise output
+                chunk_results[i] = _check_chunk(output, chunks[i])
+            except Exception as e:
+                logger.warning("Error in payoffs chain for chunk %d/%d (attempt %d): %s", i + 1, len(chunks), attempt + 1, e)
+                failed.append(i)
+        todo = failed
+        if not todo:
+            break
+
+    if todo:
+        logger.error("Payoffs inference failed for %d of %d chunks after %d attempts", len(todo), len(chunks), max_attempts)
+        return []
+
+    stitched = [actor for chunk_actors in chunk_results for actor in chunk_actors]
+    logger.info("Received from OpenAI: %d actors", len(stitched))
+
+    # Calculate payoffs using the algorithm from pay-off-formula.md
+    try:
+        from maths.calculate_payoffs import calculate_payoffs
+        return calculate_payoffs(stitched)
+    except Exception:
+        logger.exception("Error in payoffs chain")
         return []
 
+def iter_payoffs(problem_description: str, actors_json: str,
+                 system_objective: str = "the social problem") -> Iterator[ActorEntry]:
+    """
+    Stream one payoffs call, yielding each actor as soon as its JSON object closes.
+
+    Takes the same arguments as `infer_payoffs`, but sends every actor in one
+    prompt and does not retry. Each yielded actor is validated and has its
+    `payoff_epoch_0` values calculated. Raises if the stream fails or a row
+    does not validate; rows already yielded stay valid.
+
+    LangChain does not cache streamed calls, so once every actor sent has come
+    back the assembled response is written to the LLM cache here, where
+    `infer_payoffs(..., chunk_size=<all actors>)` will find it.
+    """
+    llm = _get_llm()
+    messages = _payoff_messages(problem_description, actors_json, system_objective)
+    sent = [actor.get("actor_id") for actor in json.loads(actors_json)]
+    received = []
+    text = []
+    parser = JSONArrayItemParser()
+    from maths.calculate_payoffs import calculate_payoffs
+    for message in llm.stream(messages):
+        text.append(message.content)
+        for item in parser.feed(message.content):
+            actor = ActorEntry.model_validate(item)
+            received.append(actor.actor_id)
+            # Payoffs only depend on the actor's own numbers, so each row can be finished on its own
+            yield from calculate_payoffs([actor])
+    if received == sent:
+        store_response(llm, messages, "".join(text))
+
+def payoffs_cached(problem_description: str, actors_json: str, system_objective: str = "the social problem") -> bool:
+    """Whether the LLM cache holds the one-prompt payoffs response `iter_payoffs` would stream."""
+    return lookup_response(_get_llm(), _payoff_messages(problem_description, actors_json, system_objective)) is not None
+
 # Example CLI usage (can be zapped later)
 if __name__ == "__main__":
     import json, sys
@@ -0,0 +1,79 @@
+"""
+json_stream.py
+Incremental parser that pulls finished objects out of a JSON array while the
+LLM is still writing it.
+
+The chains return `{"actors": [ {...}, {...}, ... ]}`. Feeding the streamed
+text to `JSONArrayItemParser` returns each element of that array as soon as
+its closing brace arrives, so a caller can validate and show rows one by one
+instead of waiting for the whole response. Text around the JSON (such as a
+```json fence) is ignored.
+"""
+
+import json
+from typing import Any, List, Optional
+
+
+class JSONArrayItemParser:
+    """
+    Scan streamed JSON text and return the objects in its first top-level array.
+
+    The array may be the whole document or a field of the top-level object.
+    Only object elements are returned; the scan tracks strings and escapes,
+    so brackets inside string values do not confuse it.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._array_depth: Optional[int] = None  # stack depth inside the array
+        self._item_start: Optional[int] = None
+        self._done = False
+
+    def feed(self, text: str) -> List[Any]:
+        """Add the next piece of text; returns the objects it completed, in order."""
+        if self._done or not text:
+            return []
+        self._buffer += text
+        items = []
+        buffer = self._buffer
+        while self._pos < len(buffer):
+            ch = buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._array_depth is None:
+                    if ch == "[" and len(self._stack) <= 1:
+                        self._array_depth = len(self._stack) + 1
+                elif ch == "{" and len(self._stack) == self._array_depth:
+                    self._item_start = self._pos
+                self._stack.append(ch)
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if self._array_depth is not None:
+                    if self._item_start is not None and len(self._stack) == self._array_depth:
+                        items.append(json.loads(buffer[self._item_start:self._pos + 1]))
+                        self._item_start = None
+                    elif len(self._stack) < self._array_depth:
+                        self._done = True
+                        break
+            self._pos += 1
+
+        # Keep only the unfinished item, so long responses are not rescanned or held in memory
+        keep_from = self._pos if self._item_start is None else self._item_start
+        self._buffer = buffer[keep_from:]
+        self._pos -= keep_from
+        if self._item_start is not None:
+            self._item_start = 0
+        return items
@@ -0,0 +1,311 @@
+"""
+llm_backend.py
+Chat-model factory for the chains in api/openai/, with an offline stand-in.
+
+`get_chat_model` returns a ChatOpenAI model by default. Set LLM_BACKEND=fake to
+get FakeChatModel instead: it needs no API key or network, and returns
+seeded, schema-valid JSON for each task, so the whole pipeline
+(actors → outcome targets → payoffs → behaviour shares → analysis → simulation)
+can be benchmarked and load-tested offline. Its size and latency are set in config:
+
+    LLM_BACKEND=fake FAKE_LLM_ACTORS=500 FAKE_LLM_LATENCY_SECONDS=0.5 python main.py
+
+The fake model reads the actors it is asked about from the rendered prompt,
+so payoffs and behaviour shares line up with the actors produced earlier.
+It uses the LLM cache like ChatOpenAI does; set LLM_CACHE_ENABLED=0 to time
+every call.
+
+Models, and the chains built on them with `get_shared`, are created once per
+process and reused by every request. All ChatOpenAI models send their requests
+through one pooled HTTP client, so connections to the API are kept alive
+between calls and the number open at once is capped (LLM_HTTP_* in config).
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, TypeVar
+
+import numpy as np
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from config import (
+    FAKE_LLM_ACTORS, FAKE_LLM_LATENCY_SECONDS, FAKE_LLM_SEED, LLM_BACKEND,
+    LLM_HTTP_KEEPALIVE_SECONDS, LLM_HTTP_MAX_CONNECTIONS, LLM_HTTP_MAX_KEEPALIVE, LLM_HTTP_TIMEOUT_SECONDS
+)
+from api.openai.llm_cache import get_llm_cache
+
+TASKS = ("actors", "outcome_targets", "payoffs", "behavior_shares", "payoff_analysis")
+
+_SECTORS = [
+    "Central Government", "Local Authorities", "Social Investors", "Justice System",
+    "Charities and NGOs", "Private Sector", "Healthcare Providers", "Affected Populations"
+]
+_COMMITMENT_LEVELS = ("High", "Medium", "Low")
+# (delta, private_cost) ranges per commitment level, as requested in the payoffs prompt
+_PAYOFF_RANGES = {
+    "High": ((-0.15, -0.08), (0.040, 0.080)),
+    "Medium": ((-0.08, -0.04), (0.020, 0.040)),
+    "Low": ((-0.04, -0.01), (0.005, 0.020))
+}
+
+
+def uses_fake_backend() -> bool:
+    return LLM_BACKEND == "fake"
+
+
+T = TypeVar("T")
+
+_shared: Dict[Hashable, Any] = {}
+_shared_pid: Optional[int] = None
+_shared_lock = threading.RLock()
+
+
+def get_shared(key: Hashable, build: Callable[[], T]) -> T:
+    """
+    The process-wide object stored under `key`, built with `build()` on first use.
+
+    Used for chat models, HTTP clients and compiled chains, which are safe to
+    share between threads. Everything is rebuilt in a forked child, so a worker
+    never reuses connections opened by its parent.
+    """
+    global _shared_pid
+    with _shared_lock:
+        if _shared_pid != os.getpid():
+            _shared.clear()
+            _shared_pid = os.getpid()
+        if key not in _shared:
+            _shared[key] = build()
+        return _shared[key]
+
+
+def _get_http_client():
+    import httpx
+    return get_shared("http_client", lambda: httpx.Client(
+        limits=httpx.Limits(
+            max_connections=LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_HTTP_KEEPALIVE_SECONDS
+        ),
+        timeout=LLM_HTTP_TIMEOUT_SECONDS
+    ))
+
+
+def get_chat_model(task: str, model_name: str, temperature: float, refresh: bool = False,
+                   cache: Any = None, **kwargs) -> BaseChatModel:
+    """
+    Chat model for one of the api/openai tasks (see TASKS), shared by every caller asking for the same one.
+
+    The model uses the shared LLM cache; with `refresh` it skips cached
+    responses (see get_llm_cache). Passing `cache` explicitly builds a new,
+    unshared model. Extra keyword arguments go to ChatOpenAI and are ignored
+    by the fake backend.
+    """
+    if task not in TASKS:
+        raise ValueError(f"Unknown LLM task '{task}', expected one of {TASKS}")
+    if cache is not None:
+        return _build_chat_model(task, model_name, temperature, cache, kwargs)
+    key = ("chat_model", LLM_BACKEND, task, model_name, temperature, refresh, tuple(sorted(kwargs.items())))
+    return get_shared(key, lambda: _build_chat_model(
+        task, model_name, temperature, get_llm_cache(refresh=refresh), kwargs
+    ))
+
+
+def _build_chat_model(task: str, model_name: str, temperature: float, cache: Any, kwargs: Dict) -> BaseChatModel:
+    if uses_fake_backend():
+        return FakeChatModel(task=task, seed=FAKE_LLM_SEED, n_actors=FAKE_LLM_ACTORS,
+                             latency_seconds=FAKE_LLM_LATENCY_SECONDS, cache=cache)
+    if LLM_BACKEND != "openai":
+        raise ValueError(f"Unknown LLM_BACKEND '{LLM_BACKEND}', expected 'openai' or 'fake'")
+
+    from langchain_openai import ChatOpenAI
+    kwargs = dict(kwargs)
+    kwargs.setdefault("timeout", LLM_HTTP_TIMEOUT_SECONDS)
+    return ChatOpenAI(
+        model_name=model_name,
+        temperature=temperature,
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        cache=cache,
+        http_client=_get_http_client(),
+        **kwargs
+    )
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Offline chat model returning seeded synthetic JSON for one task.
+
+    Like ChatOpenAI it streams, in `stream_chunk_chars` pieces, so streamed
+    calls take the same (uncached) path offline as they do against the API.
+    """
+
+    task: str
+    seed: int = 0
+    n_actors: int = 8
+    latency_seconds: float = 0.0
+    stream_chunk_chars: int = 64
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-evosocial"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        message = AIMessage(content=self._respond(messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        text = self._respond(messages)
+        for start in range(0, len(text), self.stream_chunk_chars):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text[start:start + self.stream_chunk_chars]))
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        """The response text for one call; every call to the model goes through here."""
+        prompt = "\n".join(str(message.content) for message in messages)
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+        # Same seed and prompt give the same response
+        digest = hashlib.sha256(f"{self.seed}\x00{self.task}\x00{prompt}".encode()).digest()
+        rng = np.random.default_rng(int.from_bytes(digest[:8], "little"))
+
+        if self.task == "actors":
+            payload = _fake_actors(rng, self.n_actors)
+        elif self.task == "outcome_targets":
+            payload = _fake_outcome_targets(rng)
+        elif self.task == "payoffs":
+            payload = _fake_payoffs(rng, _find_actors(prompt))
+        elif self.task == "behavior_shares":
+            payload = _fake_behavior_shares(rng, _find_actors(prompt))
+        else:
+            payload = _fake_payoff_analysis(rng, prompt)
+        return json.dumps(payload)
+
+
+def _actor_code(i: int) -> str:
+    """Two-letter actor ID: AA, AB, ..., ZZ, then repeating."""
+    i %= 26 * 26
+    return chr(ord("A") + i // 26) + chr(ord("A") + i % 26)
+
+
+def _fake_actors(rng: np.random.Generator, n_actors: int) -> dict:
+    actors = []
+    for i in range(n_actors):
+        sector = _SECTORS[i % len(_SECTORS)]
+        if n_actors > len(_SECTORS):
+            sector = f"{sector} {i // len(_SECTORS) + 1}"
+        code = _actor_code(i)
+        actors.append({
+            "sector": sector,
+            "role_in_alleviating_child_poverty": f"Synthetic role {int(rng.integers(1000))} for {sector}",
+            "actor_index": f"g={i + 1}",
+            "actor_id": code,
+            "strategies": [
+                {
+                    "id": f"{code}-{k + 1}",
+                    "description": f"{level} commitment approach for {sector}",
+                    "commitment_level": level
+                }
+                for k, level in enumerate(_COMMITMENT_LEVELS)
+            ]
+        })
+    return {"actors": actors}
+
+
+def _fake_outcome_targets(rng: np.random.Generator) -> dict:
+    targets = []
+    for i in range(3):
+        from_value = round(float(rng.uniform(50, 150)), 1)
+        to_value = round(from_value * float(rng.uniform(0.7, 0.95)), 1)
+        targets.append({
+            "metric_name": f"Synthetic outcome metric {i + 1}",
+            "from_value": from_value,
+            "from_unit": "per 1,000 people",
+            "to_value": to_value,
+            "to_unit": "per 1,000 people",
+            "timeframe_years": int(rng.integers(2, 11)),
+            "rationale": "Synthetic target generated offline for benchmarking.",
+            "sources": [f"Synthetic source {i + 1} (Offline, 2025)"]
+        })
+    return {"targets": targets}
+
+
+def _find_actors(prompt: str) -> List[dict]:
+    """The JSON list of actor objects embedded in a rendered prompt."""
+    decoder = json.JSONDecoder()
+    for match in re.finditer(r"\[", prompt):
+        try:
+            value, _ = decoder.raw_decode(prompt, match.start())
+        except ValueError:
+            continue
+        if isinstance(value, list) and value and all(isinstance(a, dict) and "strategies" in a for a in value):
+            return value
+    raise ValueError("Fake LLM backend found no actors JSON in the prompt")
+
+
+def _fake_payoffs(rng: np.random.Generator, actors: List[dict]) -> dict:
+    enriched = []
+    for actor in actors:
+        strategies = []
+        for strategy in actor["strategies"]:
+            delta_range, cost_range = _PAYOFF_RANGES.get(strategy.get("commitment_level"), _PAYOFF_RANGES["Medium"])
+            strategies.append({
+                "id": strategy["id"],
+                "description": strategy["description"],
+                "commitment_level": strategy["commitment_level"],
+                "delta": round(float(rng.uniform(*delta_range)), 3),
+                "private_cost": round(float(rng.uniform(*cost_range)), 3)
+            })
+        enriched.append({
+            "sector": actor["sector"],
+            "role_in_alleviating_child_poverty": actor["role_in_alleviating_child_poverty"],
+            "actor_index": actor["actor_index"],
+            "actor_id": actor["actor_id"],
+            "weight": round(float(rng.uniform(0.2, 1.0)), 3),
+            "strategies": strategies
+        })
+    return {"actors": enriched}
+
+
+def _fake_behavior_shares(rng: np.random.Generator, actors: List[dict]) -> dict:
+    enriched = []
+    for actor in actors:
+        payoffs = np.array([strategy.get("payoff_epoch_0") or 0.0 for strategy in actor["strategies"]])
+        # Lean towards higher payoffs, never below 5 %, rounded to 3 decimals summing to 1
+        weights = np.exp((payoffs - payoffs.max()) * 20) + rng.uniform(0.2, 1.0, len(payoffs))
+        shares = np.round(0.05 + (1 - 0.05 * len(payoffs)) * weights / weights.sum(), 3)
+        shares[-1] = round(1.0 - shares[:-1].sum(), 3)
+        strategies = [{**strategy, "behavior_share_epoch_0": float(share)}
+                      for strategy, share in zip(actor["strategies"], shares)]
+        enriched.append({**actor, "strategies": strategies})
+    return {"actors": enriched}
+
+
+def _fake_payoff_analysis(rng: np.random.Generator, prompt: str) -> dict:
+    # Strategy lines look like "  - CG-1 (High): Δ=..., Cost=..., Payoff=..." under "**Sector (CG)**"
+    sectors = dict((code, sector) for sector, code in re.findall(r"\*\*(.+?) \(([A-Z]{2})\)\*\*", prompt))
+    strategies = re.findall(r"- ([A-Z]{2}-\d+) \((\w+)\):.*?Payoff=([-\d.]+)\n\s*Description: (.*)", prompt)
+    if not strategies:
+        return {"strategy_analyses": []}
+
+    picks = rng.choice(len(strategies), size=min(3, len(strategies)), replace=False)
+    categories = ("Best Performer", "Middle Ground", "Floor Strategy")
+    analyses = []
+    for category, i in zip(categories, sorted(picks, key=lambda i: -float(strategies[i][2]))):
+        strategy_id, level, payoff, description = strategies[i]
+        analyses.append({
+            "strategy_id": strategy_id,
+            "actor_sector": sectors.get(strategy_id.split("-")[0], "Unknown"),
+            "commitment_level": level,
+            "strategy_description": description.strip(),
+            "payoff_category": category,
+            "economic_attractiveness": f"Synthetic assessment at payoff {payoff}.",
+            "key_insights": ["Synthetic insight generated offline.", "Use for benchmarking only."]
+        })
+    return {"strategy_analyses": analyses}
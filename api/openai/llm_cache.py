@@ -0,0 +1,187 @@
+"""
+llm_cache.py
+Persistent, SQLite-backed cache for LLM responses, shared by every chain in api/openai/.
+
+LangChain consults a model's cache before calling the API. It hands over the
+rendered prompt, which also contains each parser's format instructions (so
+the parser schema is part of the prompt), and an `llm_string` that serialises
+the model name, temperature and other call parameters. The cache key is a
+hash of both. Entries expire after a TTL, and once the stored responses grow
+past a size cap the least recently used ones are dropped.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from typing import Any, List, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.language_models import BaseChatModel
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration
+
+from config import LLM_CACHE_ENABLED, LLM_CACHE_MAX_BYTES, LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Generations are stored with LangChain's own serialiser, which warns that it is in beta on every call
+warnings.filterwarnings("ignore", message="The function `loads` is in beta")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS llm_cache_by_use ON llm_cache (last_used);
+"""
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    LangChain cache stored in a SQLite file.
+
+    Parameters
+    ----------
+    path : str
+        SQLite file; its directory is created if needed.
+    ttl_seconds : float, optional
+        Age after which an entry is treated as a miss. None keeps entries forever.
+    max_bytes : int, optional
+        Cap on the total size of stored responses; least recently used go first.
+    """
+
+    def __init__(self, path: str, ttl_seconds: Optional[float] = None, max_bytes: Optional[int] = None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode()).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+        try:
+            generations = loads(value)
+        except Exception as e:
+            logger.warning("Ignoring unreadable LLM cache entry: %s", e)
+            return None
+        logger.debug("LLM cache hit")
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        value = dumps(return_val)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (self._key(prompt, llm_string), value, len(value), now, now)
+            )
+            self._evict(now)
+
+    def _evict(self, now: float):
+        """Drop expired entries, then least recently used ones while over `max_bytes`."""
+        if self.ttl_seconds is not None:
+            self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        if self.max_bytes is None:
+            return
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in self._conn.execute("SELECT key, size FROM llm_cache ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", stale)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM llm_cache")
+
+
+class RefreshingCache(BaseCache):
+    """
+    Write-through view of another cache that never serves hits.
+
+    Used when retrying a call whose cached response failed to parse: the retry
+    goes to the API, and its response replaces the bad entry.
+    """
+
+    def __init__(self, cache: BaseCache):
+        self.cache = cache
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self.cache.update(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.cache.clear(**kwargs)
+
+
+_cache: Optional[SQLiteLLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache(refresh: bool = False) -> Optional[BaseCache]:
+    """
+    The process-wide LLM cache, opened on first use; None when disabled in config.
+
+    `get_chat_model` passes it to the models it builds. With `refresh`, the
+    model skips cached responses but still stores its own.
+    """
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = SQLiteLLMCache(LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_BYTES)
+    return RefreshingCache(_cache) if refresh else _cache
+
+
+# LangChain only consults the cache for invoke/batch; streamed calls use these to share its entries
+def _model_cache(llm: BaseChatModel) -> Optional[BaseCache]:
+    return llm.cache if isinstance(llm.cache, BaseCache) else None
+
+
+def lookup_response(llm: BaseChatModel, messages: List[BaseMessage]) -> Optional[RETURN_VAL_TYPE]:
+    """The cached generations `llm.invoke(messages)` would return, or None on a miss (or without a cache)."""
+    cache = _model_cache(llm)
+    if cache is None:
+        return None
+    return cache.lookup(dumps(messages), llm._get_llm_string())
+
+
+def store_response(llm: BaseChatModel, messages: List[BaseMessage], text: str) -> None:
+    """Cache `text` as the response to `messages`, under the key `llm.invoke(messages)` looks up."""
+    cache = _model_cache(llm)
+    if cache is not None:
+        cache.update(dumps(messages), llm._get_llm_string(), [ChatGeneration(message=AIMessage(content=text))])
@@ -0,0 +1,203 @@
+"""
+pipeline.py
+Run independent inference chains concurrently.
+
+Actors and outcome targets both depend only on the problem text, so
+`analyze_problem` requests them at the same time. Payoffs and behaviour shares
+only depend on one actor at a time, so `iter_landscape` splits the actors into
+chunks and pipelines them: as soon as a chunk's payoffs arrive its behaviour
+shares are requested, while other chunks are still waiting for their payoffs.
+End-to-end time is roughly the slowest single payoffs call plus the slowest
+behaviour-shares call, rather than the sum over every step.
+
+Payoffs calls are streamed, and each actor is reported as soon as its row has
+been parsed, before its behaviour shares are known. A chunk whose stream
+fails or leaves actors out falls back to the retrying `infer_payoffs`.
+
+The chains are blocking (they wait on HTTP), so a thread pool is enough; it is
+shared by every request so the number of concurrent LLM calls stays bounded.
+"""
+
+import json
+import logging
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import LLM_MAX_CONCURRENCY, PIPELINE_CHUNK_SIZE
+
+# The chains pull in LangChain and the OpenAI client, so they are imported where they are used
+if TYPE_CHECKING:
+    from api.openai.infer_actors import ActorsTable
+    from api.openai.infer_outcome_target import OutcomeTargets
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm")
+    return _executor
+
+
+def warm_up() -> None:
+    """Build the thread pool, shared HTTP client and compiled chains before the first request needs them."""
+    from api.openai import analyze_payoffs, infer_behavior_shares, infer_payoffs
+    _get_executor()
+    for refresh in (False, True):
+        infer_payoffs._get_payoff_chain(refresh)
+    infer_behavior_shares._get_behavior_shares_chain()
+    analyze_payoffs._get_analysis_chain()
+
+
+def analyze_problem(problem_description: str) -> Tuple[Optional["ActorsTable"], Optional["OutcomeTargets"]]:
+    """
+    Infer actors and outcome targets for a problem at the same time.
+
+    Returns
+    -------
+    Tuple[ActorsTable | None, OutcomeTargets | None]
+        Each is None if its own chain failed; one failing does not cancel the other.
+    """
+    from api.openai.infer_actors import infer_actors_from_problem
+    from api.openai.infer_outcome_target import infer_outcome_targets_from_problem
+    executor = _get_executor()
+    actors_future = executor.submit(infer_actors_from_problem, problem_description)
+    targets_future = executor.submit(infer_outcome_targets_from_problem, problem_description)
+    return actors_future.result(), targets_future.result()
+
+
+def _chunks(items: List, size: int) -> List[List]:
+    size = max(1, size)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _infer_payoffs_chunk(problem_description: str, actors: List[Dict], system_objective: str,
+                         on_row: Callable[[object], None]) -> List:
+    from api.openai.infer_payoffs import infer_payoffs, iter_payoffs, payoffs_cached
+    actors_json = json.dumps(actors, indent=2)
+    # With the whole chunk in one prompt, the streamed call and infer_payoffs share a cache entry
+    if payoffs_cached(problem_description, actors_json, system_objective):
+        rows = infer_payoffs(problem_description, actors_json, system_objective, chunk_size=len(actors))
+        for actor in rows:
+            on_row(actor)
+        return rows
+    rows = []
+    try:
+        for actor in iter_payoffs(problem_description, actors_json, system_objective):
+            rows.append(actor)
+            on_row(actor)
+        received = [actor.actor_id for actor in rows]
+        sent = [actor.get("actor_id") for actor in actors]
+        if received == sent:
+            return rows
+        logger.warning("Streamed payoffs returned actors %s, expected %s; retrying without streaming", received, sent)
+    except Exception as e:
+        logger.warning("Error streaming payoffs: %s; retrying without streaming", e)
+    return infer_payoffs(problem_description, actors_json, system_objective, chunk_size=len(actors))
+
+
+def _infer_behavior_shares_chunk(problem_description: str, actors: List) -> List:
+    from api.openai.infer_behavior_shares import infer_behavior_shares
+    return infer_behavior_shares(problem_description, actors, epoch=0)
+
+
+def iter_landscape(problem_description: str, actors: List[Dict], system_objective: str,
+                   chunk_size: int = PIPELINE_CHUNK_SIZE) -> Iterator[Dict]:
+    """
+    Pipeline payoffs and behaviour shares over chunks of actors, reporting as chunks finish.
+
+    Parameters
+    ----------
+    problem_description : str
+        The problem text fed into the earlier steps.
+    actors : List[Dict]
+        Actors from the actor-identification step, as plain dicts.
+    system_objective : str
+        The selected target metric.
+    chunk_size : int
+        Actors per payoffs / behaviour-shares call.
+
+    Yields
+    ------
+    Dict
+        One event per finished call or streamed row, in completion order:
+        {"stage": "payoff_row" | "payoffs" | "behavior_shares", "done", "total", "actors"}.
+        `actors` holds one actor with payoffs but no behaviour shares yet for
+        "payoff_row", that chunk's finished actors for "behavior_shares", and
+        is empty for "payoffs". A chunk's rows may be reported again if its
+        stream had to be retried.
+        The last event has stage "complete" and the full landscape in `actors`,
+        in the original actor order, or stage "error" with a `message` if any
+        chunk's payoffs failed.
+    """
+    chunks = _chunks(actors, chunk_size)
+    total = 2 * len(chunks)
+    done = 0
+    finished: Dict[int, List] = {}
+    failed = []
+
+    executor = _get_executor()
+    # Workers post (stage, chunk index, finished future or streamed actor); the generator drains them here
+    events: "queue.Queue[Tuple[str, int, object]]" = queue.Queue()
+
+    def submit(stage: str, i: int, fn: Callable, *args) -> None:
+        future = executor.submit(fn, *args)
+        future.add_done_callback(lambda f: events.put((stage, i, f)))
+
+    for i, chunk in enumerate(chunks):
+        submit("payoffs", i, _infer_payoffs_chunk, problem_description, chunk, system_objective,
+               lambda actor, i=i: events.put(("payoff_row", i, actor)))
+    running = len(chunks)
+    logger.info("Pipelining %d actors in %d chunks of up to %d", len(actors), len(chunks), chunk_size)
+
+    while running:
+        stage, i, item = events.get()
+        if stage == "payoff_row":
+            yield {"stage": stage, "done": done, "total": total, "actors": [item]}
+            continue
+
+        running -= 1
+        future: Future = item
+        try:
+            chunk_result = future.result()
+        except Exception as e:
+            logger.error("Error in %s for chunk %d: %s", stage, i, e)
+            chunk_result = []
+        done += 1
+
+        if stage == "payoffs":
+            if not chunk_result:
+                failed.append(i)
+                done += 1  # its behaviour-shares step will not run
+                yield {"stage": stage, "done": done, "total": total, "actors": []}
+                continue
+            # Behaviour shares only need this chunk's payoffs
+            submit("behavior_shares", i, _infer_behavior_shares_chunk, problem_description, chunk_result)
+            running += 1
+            yield {"stage": stage, "done": done, "total": total, "actors": []}
+        else:
+            finished[i] = chunk_result
+            yield {"stage": stage, "done": done, "total": total, "actors": chunk_result}
+
+    if failed:
+        yield {"stage": "error", "done": done, "total": total, "actors": [],
+               "message": f"Payoffs inference returned no data for {len(failed)} of {len(chunks)} chunks"}
+        return
+    landscape = [actor for i in range(len(chunks)) for actor in finished[i]]
+    yield {"stage": "complete", "done": done, "total": total, "actors": landscape}
+
+
+def infer_landscape(problem_description: str, actors: List[Dict], system_objective: str,
+                    chunk_size: int = PIPELINE_CHUNK_SIZE) -> List:
+    """Blocking form of `iter_landscape`: the finished actors, or [] if payoffs failed."""
+    for event in iter_landscape(problem_description, actors, system_objective, chunk_size):
+        if event["stage"] == "complete":
+            return event["actors"]
+    return []
@@ -0,0 +1,341 @@
+"""
+bench_hotpaths.py
+Benchmarks for the simulation and payoff hot paths, with a history file for
+spotting regressions.
+
+    python -m benchmarks.bench_hotpaths
+    python -m benchmarks.bench_hotpaths -k run_simulation --sizes 3 30 --epochs 50 1000
+    python -m benchmarks.bench_hotpaths --label before
+    python -m benchmarks.bench_hotpaths --label after --compare before
+
+Cases run on seeded synthetic landscapes (see landscapes.py):
+
+    parse_rows_to_arrays[G]         rows -> arrays
+    run_simulation[G,epochs,record] every G in --sizes, every length in --epochs
+    calculate_payoffs[G]            epoch-0 payoffs on ActorEntry objects
+    process_payoffs_data[G]         the same plus the pandas export
+    generate_plots[G,epochs]        all three plots, in-process
+    simulate_*[G,epochs]            POST /simulate through the Flask test client:
+                                    sync (fresh result), cached (repeat request),
+                                    and async (queued, polled until complete)
+
+Each case is timed like `timeit`: calls are batched until a sample takes at
+least 0.2 s, and samples are taken until --repeat are done or the case has run
+for --max-seconds. Every run is appended as one JSON line to --history, along
+with the git commit, so runs before and after a change can be compared with
+--compare; the exit status is 1 if a case failed or regressed by more than
+--threshold.
+
+Targets are set out of reach so a simulation always lasts all of its epochs.
+Runs whose full history would exceed --max-history-mb are recorded with
+"summary" instead, and the case name says so.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.landscapes import synthetic_actors, synthetic_rows, unreachable_target
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = (3, 30, 300, 3000)
+DEFAULT_EPOCHS = (50, 1000, 100000)
+DEFAULT_PLOT_SIZES = (3, 30, 300)
+DEFAULT_APP_SIZES = (3, 30, 300)
+PLOT_EPOCHS = 1000
+APP_EPOCHS = 1000
+P_BASELINE = 100.0
+HISTORY_PATH = os.path.join(REPO_ROOT, "benchmarks", "history.jsonl")
+
+# A case is a name and a setup function. Setup is not timed; it imports what the case needs and
+# returns the function that is timed, so listing cases is cheap and a missing dependency fails one case
+Case = Tuple[str, Callable[[], Callable[[], object]]]
+
+
+def history_bytes(G: int, epochs: int) -> int:
+    """Memory for full float64 share and payoff histories of a three-strategy run."""
+    return 2 * G * 3 * epochs * 8
+
+
+def simulation_cases(sizes, epochs_list, record: str, max_history_mb: float) -> List[Case]:
+    def parse(G):
+        from simulation import parse_rows_to_arrays
+        rows = synthetic_rows(G)
+        return lambda: parse_rows_to_arrays(rows)
+
+    def simulate(G, epochs, mode):
+        from simulation import run_simulation
+        rows = synthetic_rows(G)
+        target = unreachable_target(P_BASELINE, G)
+        return lambda: run_simulation(rows, P_BASELINE, target, epochs, record=mode)
+
+    cases = [(f"parse_rows_to_arrays[G={G}]", lambda G=G: parse(G)) for G in sizes]
+    for G, epochs in itertools.product(sizes, epochs_list):
+        mode = record
+        if mode == "full" and history_bytes(G, epochs) > max_history_mb * 1024 * 1024:
+            mode = "summary"
+        cases.append((f"run_simulation[G={G},epochs={epochs},record={mode}]",
+                      lambda G=G, epochs=epochs, mode=mode: simulate(G, epochs, mode)))
+    return cases
+
+
+def payoff_cases(sizes) -> List[Case]:
+    def payoffs(G):
+        from maths.calculate_payoffs import calculate_payoffs
+        actors = synthetic_actors(G)
+        return lambda: calculate_payoffs(actors)
+
+    def payoffs_data(G):
+        from maths.calculate_payoffs import process_payoffs_data
+        actors = synthetic_actors(G)
+        return lambda: process_payoffs_data(actors)
+
+    cases = []
+    for G in sizes:
+        cases.append((f"calculate_payoffs[G={G}]", lambda G=G: payoffs(G)))
+        cases.append((f"process_payoffs_data[G={G}]", lambda G=G: payoffs_data(G)))
+    return cases
+
+
+def plot_cases(sizes) -> List[Case]:
+    def setup(G):
+        from simulation import generate_plots, parse_rows_to_arrays, run_simulation
+        rows = synthetic_rows(G)
+        target = unreachable_target(P_BASELINE, G)
+        result = run_simulation(rows, P_BASELINE, target, PLOT_EPOCHS)
+        sector_names = parse_rows_to_arrays(rows)[5]
+
+        def render():
+            for filename in generate_plots(result, P_BASELINE, target, sector_names):
+                os.remove(os.path.join("static", "plots", filename))
+        return render
+    return [(f"generate_plots[G={G},epochs={PLOT_EPOCHS}]", lambda G=G: setup(G)) for G in sizes]
+
+
+def app_cases(sizes, cache_dir: str) -> List[Case]:
+    """POST /simulate end to end; results go to `cache_dir` so the app's own result cache is untouched."""
+    clients = []
+    fresh = itertools.count(1)
+
+    def client():
+        if not clients:
+            import routes_simulation
+            from main import app
+            from plot_renderer import PlotRenderer
+            from result_cache import ResultCache
+            routes_simulation.cache = ResultCache(cache_dir)
+            routes_simulation.renderer = PlotRenderer(plot_dir=cache_dir, loader=routes_simulation.cache.load)
+            clients.append(app.test_client())
+        return clients[0]
+
+    def payload(G, sync):
+        return {"rows": synthetic_rows(G), "P_baseline": P_BASELINE,
+                "P_target": unreachable_target(P_BASELINE, G), "max_epochs": APP_EPOCHS, "async": not sync}
+
+    def post(body):
+        response = client().post("/simulate", json=body)
+        if response.status_code not in (200, 202):
+            raise RuntimeError(f"/simulate returned {response.status_code}: {response.get_json()}")
+        return response.get_json()
+
+    def sync(G):
+        body = payload(G, sync=True)
+
+        def call():
+            # A baseline nobody has asked for yet, so the result cache misses
+            body["P_baseline"] = P_BASELINE + next(fresh) * 1e-9
+            post(body)
+        return call
+
+    def cached(G):
+        body = payload(G, sync=True)
+        post(body)
+        return lambda: post(body)
+
+    def queued(G):
+        body = payload(G, sync=False)
+
+        def call():
+            body["P_baseline"] = P_BASELINE + next(fresh) * 1e-9
+            result_url = post(body)["result_url"]
+            while True:
+                job = client().get(result_url).get_json()
+                if job["status"] == "complete":
+                    return
+                if job["status"] == "error":
+                    raise RuntimeError(job["error"])
+                time.sleep(0.001)
+        return call
+
+    cases = []
+    for G in sizes:
+        suffix = f"[G={G},epochs={APP_EPOCHS}]"
+        cases.append(("simulate_sync" + suffix, lambda G=G: sync(G)))
+        cases.append(("simulate_cached" + suffix, lambda G=G: cached(G)))
+        cases.append(("simulate_async" + suffix, lambda G=G: queued(G)))
+    return cases
+
+
+def measure(fn: Callable[[], object], repeat: int, max_seconds: float) -> Dict:
+    """Seconds per call: median and best of up to `repeat` samples, each at least 0.2 s long."""
+    timer = timeit.Timer(fn)
+    started = time.perf_counter()
+    number, first = timer.autorange()
+    samples = [first / number]
+    while len(samples) < repeat and time.perf_counter() - started + first < max_seconds:
+        samples.append(timer.timeit(number) / number)
+    return {"median_seconds": statistics.median(samples), "min_seconds": min(samples),
+            "samples": len(samples), "calls_per_sample": number}
+
+
+def run(cases: List[Case], pattern: Optional[str], repeat: int, max_seconds: float) -> Dict[str, Dict]:
+    """Run every case whose name contains `pattern`; a case that fails is reported, not raised."""
+    report = {}
+    for name, setup in cases:
+        if pattern and pattern not in name:
+            continue
+        try:
+            row = measure(setup(), repeat, max_seconds)
+        except Exception as e:
+            row = {"error": f"{type(e).__name__}: {e}"}
+            print(f"{name:52s} failed: {row['error']}")
+        else:
+            print(f"{name:52s} median {format_seconds(row['median_seconds'])}  "
+                  f"min {format_seconds(row['min_seconds'])}  x{row['samples']}")
+        report[name] = row
+    return report
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (("s ", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+
+def git_revision() -> Tuple[Optional[str], bool]:
+    """(commit hash, whether the tree has uncommitted changes); (None, False) outside git."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=REPO_ROOT, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                capture_output=True, text=True, cwd=REPO_ROOT, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit, bool(status.strip())
+
+
+def load_history(path: str) -> List[Dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(path: str, entry: Dict) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def find_baseline(history: List[Dict], ref: Optional[str]) -> Optional[Dict]:
+    """Latest entry whose label equals `ref` or whose commit starts with it; the latest entry if `ref` is None."""
+    for entry in reversed(history):
+        if ref is None or entry.get("label") == ref or (entry.get("commit") or "").startswith(ref):
+            return entry
+    return None
+
+
+def compare(report: Dict[str, Dict], baseline: Dict, threshold: float) -> List[str]:
+    """Print the change in median time per case; returns the cases slower than 1 + threshold times the baseline."""
+    regressions = []
+    print(f"\nCompared with {baseline.get('label') or baseline.get('commit') or 'previous run'} "
+          f"({baseline['timestamp']}):")
+    for name, row in report.items():
+        before = baseline["results"].get(name, {})
+        if "median_seconds" not in row or "median_seconds" not in before:
+            continue
+        ratio = row["median_seconds"] / before["median_seconds"]
+        slower = ratio > 1 + threshold
+        if slower:
+            regressions.append(name)
+        print(f"{name:52s} {format_seconds(before['median_seconds'])} -> {format_seconds(row['median_seconds'])}"
+              f"  x{ratio:5.2f}{' REGRESSION' if slower else ''}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-k", dest="pattern", help="Only run cases whose name contains this")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Actor counts G")
+    parser.add_argument("--epochs", type=int, nargs="+", default=list(DEFAULT_EPOCHS), help="max_epochs values")
+    parser.add_argument("--plot-sizes", type=int, nargs="+", default=list(DEFAULT_PLOT_SIZES),
+                        help="Actor counts for generate_plots")
+    parser.add_argument("--app-sizes", type=int, nargs="+", default=list(DEFAULT_APP_SIZES),
+                        help="Actor counts for /simulate")
+    parser.add_argument("--record", default="full", help="History mode for run_simulation cases")
+    parser.add_argument("--max-history-mb", type=float, default=512,
+                        help="Record 'summary' instead when a full history would be larger")
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per case")
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="Stop sampling a case after this long")
+    parser.add_argument("--history", default=HISTORY_PATH, help="JSON-lines file each run is appended to")
+    parser.add_argument("--no-save", action="store_true", help="Do not append this run to the history")
+    parser.add_argument("--label", help="Name for this run in the history, e.g. 'before'")
+    parser.add_argument("--compare", nargs="?", const="", metavar="REF",
+                        help="Compare with the latest run with this label or commit (default: the latest run)")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Slow-down that counts as a regression")
+    args = parser.parse_args(argv)
+
+    # generate_plots and the app write relative to the repository root
+    os.chdir(REPO_ROOT)
+    cache_dir = tempfile.mkdtemp(prefix="bench_simulate_")
+    cases = (simulation_cases(args.sizes, args.epochs, args.record, args.max_history_mb)
+             + payoff_cases(args.sizes) + plot_cases(args.plot_sizes) + app_cases(args.app_sizes, cache_dir))
+    try:
+        report = run(cases, args.pattern, args.repeat, args.max_seconds)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    history = load_history(args.history)
+    commit, dirty = git_revision()
+    entry = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "label": args.label,
+        "commit": commit,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs",
+        "args": {name: getattr(args, name) for name in ("pattern", "sizes", "epochs", "record", "repeat")},
+        "results": report
+    }
+    if not args.no_save:
+        append_history(args.history, entry)
+
+    failed = any("error" in row for row in report.values())
+    if args.compare is not None:
+        baseline = find_baseline(history, args.compare or None)
+        if baseline is None:
+            print(f"\nNo run in {args.history} matches '{args.compare}'")
+            failed = True
+        else:
+            failed |= bool(compare(report, baseline, args.threshold))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+bench_startup.py
+Cold-start benchmark: how long importing each entry point takes, and which
+heavy dependencies it drags in.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --repeat 10 --json startup.json
+
+Each import runs in a fresh interpreter, so nothing is cached between runs.
+The pure simulation core and the CLI must not load any of HEAVY_MODULES, and
+the web app must not load them before the feature that needs them is used;
+the exit status is 1 if any target breaks its budget.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+# Dependencies that should only load on first use of the feature that needs them
+HEAVY_MODULES = ("langchain", "langchain_core", "langchain_openai", "openai", "pandas", "matplotlib", "pydantic")
+
+# Module -> heavy modules it is allowed to import at startup
+TARGETS = {
+    "simulation": (),
+    "simulate_cli": (),
+    "maths.calculate_payoffs": (),
+    "main": (),
+}
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = sorted(name for name in {heavy!r} if name in sys.modules)
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def time_import(module: str) -> Tuple[float, List[str]]:
+    """Import `module` in a new interpreter; returns (seconds, heavy modules loaded)."""
+    process = subprocess.run([sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                             capture_output=True, text=True, cwd=REPO_ROOT)
+    if process.returncode != 0:
+        lines = process.stderr.strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f"exit status {process.returncode}")
+    data = json.loads(process.stdout.strip().splitlines()[-1])
+    return data["seconds"], data["heavy"]
+
+
+def run(modules: List[str], repeat: int) -> Dict[str, Dict]:
+    report = {}
+    for module in modules:
+        timings, heavy = [], []
+        try:
+            for _ in range(repeat):
+                seconds, heavy = time_import(module)
+                timings.append(seconds)
+        except RuntimeError as e:
+            report[module] = {"error": str(e)}
+            continue
+        report[module] = {
+            "median_seconds": statistics.median(timings),
+            "min_seconds": min(timings),
+            "heavy_modules": heavy,
+            "unexpected": [name for name in heavy if name not in TARGETS.get(module, ())]
+        }
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("modules", nargs="*", default=list(TARGETS), help="Modules to import (default: all targets)")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--max-seconds", type=float, help="Fail if any median import time exceeds this")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = run(args.modules, args.repeat)
+    failed = False
+    for module, row in report.items():
+        if "error" in row:
+            failed = True
+            print(f"{module:28s} import failed: {row['error']}")
+            continue
+        slow = args.max_seconds is not None and row["median_seconds"] > args.max_seconds
+        failed |= slow or bool(row["unexpected"])
+        flags = (" SLOW" if slow else "") + (f" UNEXPECTED {row['unexpected']}" if row["unexpected"] else "")
+        print(f"{module:28s} median {row['median_seconds'] * 1000:8.1f} ms  "
+              f"min {row['min_seconds'] * 1000:8.1f} ms  heavy {row['heavy_modules']}{flags}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
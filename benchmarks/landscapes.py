@@ -0,0 +1,79 @@
+"""
+landscapes.py
+Seeded synthetic landscapes for the benchmarks.
+
+`synthetic_rows` builds rows in the /simulate format and `synthetic_actors`
+builds the matching ActorEntry objects, so the simulation and payoff code can
+be timed at any size without an LLM. Δ-effects and costs are drawn from the
+ranges the payoffs prompt asks for, per commitment level.
+"""
+
+from typing import TYPE_CHECKING, List
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from api.openai.infer_payoffs import ActorEntry
+
+COMMITMENT_LEVELS = ("High", "Medium", "Low")
+# (delta, private_cost) ranges per commitment level, as in the payoffs prompt
+PAYOFF_RANGES = {
+    "High": ((-0.15, -0.08), (0.040, 0.080)),
+    "Medium": ((-0.08, -0.04), (0.020, 0.040)),
+    "Low": ((-0.04, -0.01), (0.005, 0.020))
+}
+PAYOFF_EPSILON = 1e-4  # same payoff floor as maths/calculate_payoffs.py
+
+
+def _draw(G: int, seed: int):
+    """(weight (G,), delta (G, K), cost (G, K), shares (G, K)) for G actors."""
+    rng = np.random.default_rng(seed)
+    weight = rng.uniform(0.2, 1.0, G)
+    delta = np.column_stack([rng.uniform(*PAYOFF_RANGES[level][0], G) for level in COMMITMENT_LEVELS])
+    cost = np.column_stack([rng.uniform(*PAYOFF_RANGES[level][1], G) for level in COMMITMENT_LEVELS])
+    shares = rng.dirichlet(np.ones(len(COMMITMENT_LEVELS)), G)
+    return weight, delta, cost, shares
+
+
+def actor_code(g: int) -> str:
+    """A unique upper-case actor id for actor number g (A0, A1, ...)."""
+    return f"A{g}"
+
+
+def synthetic_rows(G: int, seed: int = 0) -> List[List]:
+    """G actors with three strategies each, as /simulate rows."""
+    weight, delta, cost, shares = _draw(G, seed)
+    payoff = np.maximum(weight[:, None] * (-delta) - cost + PAYOFF_EPSILON, PAYOFF_EPSILON)
+    return [
+        [f"Sector {g}", f"{actor_code(g)}-{k + 1}", level, float(delta[g, k]), float(cost[g, k]),
+         float(weight[g]), float(payoff[g, k]), float(shares[g, k]), f"Synthetic strategy {k + 1}"]
+        for g in range(G)
+        for k, level in enumerate(COMMITMENT_LEVELS)
+    ]
+
+
+def unreachable_target(P_baseline: float, G: int) -> float:
+    """A target below anything G actors can reach, so a run lasts all of its epochs."""
+    return P_baseline + 2 * G * PAYOFF_RANGES["High"][0][0] - 1.0
+
+
+def synthetic_actors(G: int, seed: int = 0) -> List["ActorEntry"]:
+    """G ActorEntry objects as returned by infer_payoffs, before payoffs are calculated."""
+    from api.openai.infer_payoffs import ActorEntry, Strategy
+
+    weight, delta, cost, _ = _draw(G, seed)
+    return [
+        ActorEntry(
+            sector=f"Sector {g}",
+            role_in_alleviating_child_poverty="Synthetic actor",
+            actor_index=f"g={g + 1}",
+            actor_id=actor_code(g),
+            weight=float(weight[g]),
+            strategies=[
+                Strategy(id=f"{actor_code(g)}-{k + 1}", description=f"Synthetic strategy {k + 1}",
+                         commitment_level=level, delta=float(delta[g, k]), private_cost=float(cost[g, k]))
+                for k, level in enumerate(COMMITMENT_LEVELS)
+            ]
+        )
+        for g in range(G)
+    ]
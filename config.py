@@ -1,3 +1,5 @@
+import os
+
 # Default text for the problem input form
 
 # DEFAULT_PROBLEM_TEXT = "Low-income families in the United Kingdom face significant challenges accessing and affording fresh, nutritious foods. This problem creates and perpetuates health disparities, reduces quality of life, and imposes substantial long-term costs on individuals, communities, and healthcare systems."
@@ -11,4 +13,41 @@ DEFAULT_PROBLEM_TEXT = "Prisons across the UK hold far more people than they wer
 # DEFAULT_PROBLEM_TEXT = "The UK's ageing population, with 22 million people over 50 in England alone, is placing immense strain on the NHS. The Darzi report identifies this demographic shift as the main driver of demand. The number of people over 85 is set to increase by 55% in the next 15 years. This surge is intensifying pressure on services, lengthening waiting lists, stretching capacity, increasing costs, and worsening health inequalities across all age groups."
 
 
-SOURCES_OF_UK_SOCIAL_DATA = "Office for National Statistics (ONS), UK Data Service, Government Departments, Department for Work and Pensions, Department for Education, Department of Health and Social Care, Ministry of Housing, Communities and Local Government Ministry of Justice, Department for Transport, Department for Business, Energy & Industrial Strategy, Home Office, The House of Commons Library Joseph Rowntree Foundation (JRF), The Resolution Foundation, Crisis UK, Shelter UK, The Trussell Trust, The National Audit Office (NAO), The Institute for Fiscal Studies (IFS), The Health Foundation, The Office for Budget Responsibility (OBR), National Centre for Social Research (NatCen)"
\ No newline at end of file
+SOURCES_OF_UK_SOCIAL_DATA = "Office for National Statistics (ONS), UK Data Service, Government Departments, Department for Work and Pensions, Department for Education, Department of Health and Social Care, Ministry of Housing, Communities and Local Government Ministry of Justice, Department for Transport, Department for Business, Energy & Industrial Strategy, Home Office, The House of Commons Library Joseph Rowntree Foundation (JRF), The Resolution Foundation, Crisis UK, Shelter UK, The Trussell Trust, The National Audit Office (NAO), The Institute for Fiscal Studies (IFS), The Health Foundation, The Office for Budget Responsibility (OBR), National Centre for Social Research (NatCen)"
+
+
+# Persistent cache for LLM responses (see api/openai/llm_cache.py)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") not in ("0", "false", "False", "")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "cache/llm_cache.sqlite")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Chat-model backend for api/openai/ (see api/openai/llm_backend.py): "openai", or "fake" for offline runs
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+FAKE_LLM_ACTORS = int(os.getenv("FAKE_LLM_ACTORS", "8"))
+FAKE_LLM_LATENCY_SECONDS = float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "0"))
+
+# Concurrent LLM calls (see api/openai/pipeline.py): pool size, and actors per payoffs/behaviour-shares call
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+PIPELINE_CHUNK_SIZE = int(os.getenv("PIPELINE_CHUNK_SIZE", "2"))
+# Actors per prompt when inferring payoffs (see api/openai/infer_payoffs.py)
+PAYOFFS_CHUNK_SIZE = int(os.getenv("PAYOFFS_CHUNK_SIZE", "4"))
+# Shared HTTP connection pool for OpenAI calls (see api/openai/llm_backend.py): open connections
+# (requests beyond this wait for a free one), idle connections kept alive and for how long, request timeout
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "32"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "16"))
+LLM_HTTP_KEEPALIVE_SECONDS = float(os.getenv("LLM_HTTP_KEEPALIVE_SECONDS", "60"))
+LLM_HTTP_TIMEOUT_SECONDS = float(os.getenv("LLM_HTTP_TIMEOUT_SECONDS", "120"))
+
+# Logging (see logging_config.py): level for the app's loggers, and per-epoch simulation tracing
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+SIMULATION_TRACE = os.getenv("SIMULATION_TRACE", "0") not in ("0", "false", "False", "")
+
+# Per-session web state (see session_store.py): "memory" for one worker, "sqlite" to share across workers
+# (wsgi.py and gunicorn.conf.py default to "sqlite")
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "cache/sessions.sqlite")
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "1000"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+SESSION_COOKIE_NAME = os.getenv("SESSION_COOKIE_NAME", "evosocial_session")
@@ -0,0 +1,60 @@
+"""
+gunicorn.conf.py
+Production server settings: gunicorn -c gunicorn.conf.py wsgi:app
+
+Every setting can be overridden from the environment. Workers use threads
+(gthread) because /infer_payoffs and the simulation progress streams hold a
+connection open for as long as they run.
+
+Reloads: `kill -HUP <master>` gracefully replaces the workers. With
+GUNICORN_PRELOAD on (the default), the code is loaded once in the master and
+HUP does not pick up code changes. Deploy new code with `kill -USR2 <master>`
+(a new master starts alongside the old one), then `kill -TERM` the old
+master, or set GUNICORN_PRELOAD=0 so HUP also reloads the code.
+
+Sessions default to the SQLite store here, since any worker may serve any
+request and workers are recycled. SESSION_BACKEND=memory is refused unless
+there is a single worker that is never recycled (GUNICORN_MAX_REQUESTS=0).
+"""
+
+import multiprocessing
+import os
+
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default) not in ("0", "false", "False", "")
+
+
+# Set before the app (and config.py) is imported, in the master or in the workers
+os.environ.setdefault("SESSION_BACKEND", "sqlite")
+
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5001")
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(2 * multiprocessing.cpu_count() + 1, 8))))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# Load the app (LangChain, NumPy, pandas...) once in the master and fork the workers from it
+preload_app = _env_bool("GUNICORN_PRELOAD", "1")
+
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+
+# Recycle workers now and then so slow leaks cannot build up; jitter keeps them from restarting together
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
+
+if os.environ["SESSION_BACKEND"] == "memory" and (workers > 1 or max_requests > 0):
+    raise RuntimeError(
+        f"SESSION_BACKEND=memory loses sessions with {workers} workers and max_requests={max_requests}: "
+        "use SESSION_BACKEND=sqlite, or WEB_CONCURRENCY=1 with GUNICORN_MAX_REQUESTS=0"
+    )
+
+
+def post_worker_init(worker):
+    from wsgi import warm_up
+    warm_up()
+    worker.log.info("Worker %d warmed up", worker.pid)
@@ -0,0 +1,39 @@
+"""
+logging_config.py
+One place to set up logging for the app and the batch tools.
+
+Modules log through named loggers (`logging.getLogger(__name__)`) with lazy
+%-style arguments, so a message below the configured level costs a level
+check and nothing else. Per-epoch simulation tracing goes to the separate
+`simulation.trace` logger, which stays off unless asked for explicitly, even
+at DEBUG level.
+"""
+
+import logging
+from typing import Optional, Union
+
+from config import LOG_LEVEL, SIMULATION_TRACE
+
+TRACE_LOGGER = "simulation.trace"
+# Loggers that follow `level`; third-party libraries stay at WARNING
+APP_LOGGERS = ("simulation", "maths", "api")
+
+_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+def configure_logging(level: Union[str, int, None] = None, trace: Optional[bool] = None) -> None:
+    """
+    Send the app's log records to stderr at `level` (default LOG_LEVEL from config).
+
+    `trace` turns per-epoch simulation tracing on or off (default
+    SIMULATION_TRACE from config). Safe to call more than once.
+    """
+    level = LOG_LEVEL if level is None else level
+    if isinstance(level, str):
+        level = level.upper()
+    trace = SIMULATION_TRACE if trace is None else trace
+
+    logging.basicConfig(format=_FORMAT, level=logging.WARNING)
+    for name in APP_LOGGERS:
+        logging.getLogger(name).setLevel(level)
+    logging.getLogger(TRACE_LOGGER).setLevel(logging.DEBUG if trace else logging.WARNING)
@@ -1,16 +1,21 @@
 import webbrowser
-from flask import Flask, render_template, request, redirect, url_for, Response, jsonify
+from flask import Flask, render_template, request, redirect, url_for, Response, jsonify, g, stream_with_context
+from werkzeug.local import LocalProxy
 import os
 from dotenv import load_dotenv
+
+# Load environment variables from .env file (before config reads them)
+load_dotenv()
+
 import html
-from config import DEFAULT_PROBLEM_TEXT
-from api.openai.infer_actors import infer_actors_from_problem
-from api.openai.infer_outcome_target import infer_outcome_targets_from_problem
+from config import (DEFAULT_PROBLEM_TEXT, SESSION_BACKEND, SESSION_COOKIE_NAME, SESSION_DB_PATH,
+                    SESSION_MAX_ENTRIES, SESSION_TTL_SECONDS)
+from logging_config import configure_logging
+from session_store import DEFAULT_STATE, create_session_store, new_session_id, serialise_state
 import json
 from routes_simulation import sim_bp
 
-# Load environment variables from .env file
-load_dotenv()
+configure_logging()
 
 app = Flask(__name__)
 app.register_blueprint(sim_bp)
@@ -33,27 +38,47 @@ def format_number(value):
     except (ValueError, TypeError):
         return str(value)
 
-# Store form results (in a real app, you'd use a database)
-results = {
-    'problem': DEFAULT_PROBLEM_TEXT,
-    'problem_submitted': False,
-    'actors_table': None,
-    'actors_table_error': False,
-    'outcome_targets': None,
-    'outcome_targets_error': False,
-    'system_objective_selected': False,
-    'selected_objective_index': None,
-    'payoffs_table': None,
-    'payoffs_table_error': False,
-    'payoffs_analysis': None,
-    'payoffs_analysis_error': False,
-    'simulation_results': None,  # NEW: Store simulation results
-    'simulation_error': False    # NEW: Store simulation error state
-}
+# Pipeline state is per session: loaded from the session store on first use in a request and saved
+# after the request if it changed (see session_store.py). `results` is the current session's state dict.
+sessions = create_session_store(SESSION_BACKEND, SESSION_DB_PATH, SESSION_MAX_ENTRIES, SESSION_TTL_SECONDS)
+
+def new_state() -> dict:
+    return {**DEFAULT_STATE, 'problem': DEFAULT_PROBLEM_TEXT}
+
+def get_session_state() -> dict:
+    """The current session's state, loaded once per request; a new session if the cookie is missing or stale."""
+    if 'session_state' not in g:
+        session_id = request.cookies.get(SESSION_COOKIE_NAME)
+        state = sessions.load(session_id)
+        g.session_is_new = state is None
+        if state is None:
+            session_id, state = new_session_id(), new_state()
+        g.session_id = session_id
+        g.session_state = state
+        g.session_saved = None if g.session_is_new else serialise_state(state)
+    return g.session_state
+
+def save_session_state():
+    """Persist the current session's state if it changed since it was loaded or last saved."""
+    text = serialise_state(g.session_state)
+    if text != g.session_saved:
+        sessions.save(g.session_id, g.session_state, text)
+        g.session_saved = text
+
+@app.after_request
+def store_session_state(response):
+    if 'session_state' in g:
+        save_session_state()
+        if g.session_is_new:
+            response.set_cookie(SESSION_COOKIE_NAME, g.session_id, max_age=SESSION_TTL_SECONDS,
+                                httponly=True, samesite='Lax')
+    return response
+
+results = LocalProxy(get_session_state)
 
 @app.route('/', methods=['GET'])
 def hello_world():
-    return render_template('index.html', results=results, DEFAULT_PROBLEM_TEXT=DEFAULT_PROBLEM_TEXT)
+    return render_template('index.html', results=get_session_state(), DEFAULT_PROBLEM_TEXT=DEFAULT_PROBLEM_TEXT)
 
 @app.route('/submit', methods=['POST'])
 def submit_problem():
@@ -88,21 +113,8 @@ def reset_app():
     """Reset the entire application to initial state"""
     print("\n--- RESETTING APPLICATION ---")
     
-    # Reset all results to initial state
-    results['problem'] = DEFAULT_PROBLEM_TEXT
-    results['problem_submitted'] = False
-    results['actors_table'] = None
-    results['actors_table_error'] = False
-    results['outcome_targets'] = None
-    results['outcome_targets_error'] = False
-    results['system_objective_selected'] = False
-    results['selected_objective_index'] = None
-    results['payoffs_table'] = None
-    results['payoffs_table_error'] = False
-    results['payoffs_analysis'] = None
-    results['payoffs_analysis_error'] = False
-    results['simulation_results'] = None  # NEW
-    results['simulation_error'] = False   # NEW
+    # Reset this session's results to initial state
+    results.update(new_state())
     
     print("Application reset to initial state")
     print("--------------------------------\n")
@@ -110,12 +122,35 @@ def reset_app():
     # Redirect to home page
     return redirect(url_for('hello_world'))
 
+@app.route('/analyze_problem', methods=['POST'])
+def analyze_problem():
+    """Endpoint for inferring actors and outcome targets together, concurrently"""
+    problem = results.get('problem', '')
+    if problem:
+        print("\n--- ANALYZING ACTORS AND OUTCOME TARGETS ---")
+        # LLM modules (LangChain, OpenAI) are imported on first use to keep startup fast
+        from api.openai.pipeline import analyze_problem as analyze_problem_fn
+        actors_data, outcome_targets_data = analyze_problem_fn(problem)
+        if actors_data:
+            results['actors_table'] = actors_data
+            results['actors_table_error'] = False
+        else:
+            results['actors_table_error'] = True
+        if outcome_targets_data:
+            results['outcome_targets'] = outcome_targets_data
+            results['outcome_targets_error'] = False
+        else:
+            results['outcome_targets_error'] = True
+
+    return redirect(url_for('hello_world') + '#step-2-actors-analysis')
+
 @app.route('/analyze_actors', methods=['POST'])
 def analyze_actors():
     """Endpoint specifically for analyzing actors"""
     problem = results.get('problem', '')
     if problem:
         print("\n--- ANALYZING ACTORS ---")
+        from api.openai.infer_actors import infer_actors_from_problem
         actors_data = infer_actors_from_problem(problem)
         if actors_data:
             results['actors_table'] = actors_data
@@ -131,6 +166,7 @@ def analyze_outcome_targets():
     problem = results.get('problem', '')
     if problem:
         print("\n--- ANALYZING OUTCOME TARGETS ---")
+        from api.openai.infer_outcome_target import infer_outcome_targets_from_problem
         outcome_targets_data = infer_outcome_targets_from_problem(problem)
         if outcome_targets_data:
             results['outcome_targets'] = outcome_targets_data
@@ -172,6 +208,9 @@ def infer_payoffs():
 
 def infer_payoffs_stream():
     """Streaming version of payoffs inference"""
+    from api.openai.infer_payoffs import PayoffsResponse
+    from api.openai.pipeline import iter_landscape
+    
     def generate():
         try:
             if not results.get('actors_table'):
@@ -182,8 +221,7 @@ def infer_payoffs_stream():
             
             print("\n--- INFERRING PAYOFFS (STREAMING) ---")
             
-            # Convert actors data to JSON string for the API
-            actors_json = json.dumps([actor.model_dump() for actor in results['actors_table'].actors], indent=2)
+            actors = [actor.model_dump() for actor in results['actors_table'].actors]
             problem = results.get('problem', '')
             
             # Get the selected system objective
@@ -197,63 +235,48 @@ def infer_payoffs_stream():
                 except (IndexError, AttributeError):
                     print("Could not retrieve system objective, using default")
             
-            yield f"data: {json.dumps({'status': 'progress', 'message': 'Estimating values...', 'progress': 25})}\n\n"
+            yield f"data: {json.dumps({'status': 'progress', 'message': 'Estimating values...', 'progress': 5})}\n\n"
             
-            # Call the payoffs inference API
-            from api.openai.infer_payoffs import infer_payoffs
-            payoffs_data = infer_payoffs(problem, actors_json, system_objective)
-            
-            yield f"data: {json.dumps({'status': 'progress', 'message': 'Processing payoffs data...', 'progress': 50})}\n\n"
-            
-            if payoffs_data:
-                # Create a simple container object to match the template expectations
-                class PayoffsContainer:
-                    def __init__(self, actors):
-                        self.actors = actors
-                
-                results['payoffs_table'] = PayoffsContainer(payoffs_data)
-                results['payoffs_table_error'] = False
-                print("Payoffs inference successful")
-                
-                yield f"data: {json.dumps({'status': 'progress', 'message': 'Calculating behaviour shares...', 'progress': 70})}\n\n"
-                
-                # AUTOMATICALLY CALCULATE BEHAVIOR SHARES
-                print("\n--- AUTO-INFERRING BEHAVIOR SHARES ---")
-                
-                from api.openai.infer_behavior_shares import infer_behavior_shares as infer_behavior_shares_fn
-                try:
-                    actors_with_behavior_shares = infer_behavior_shares_fn(problem, payoffs_data, epoch=0)
-                    
-                    if actors_with_behavior_shares:
-                        results['payoffs_table'] = PayoffsContainer(actors_with_behavior_shares)
-                        print("Behavior shares inference successful")
-                    else:
-                        print("Behavior shares inference returned no data, keeping payoffs data")
-                        
-                except Exception as e:
-                    print(f"Error during automatic behavior shares inference: {e}")
-                    print("Continuing with payoffs data only")
-                
-                yield f"data: {json.dumps({'status': 'complete', 'message': 'Payoffs calculation complete!', 'progress': 100})}\n\n"
-                
-            else:
-                results['payoffs_table_error'] = True
-                yield f"data: {json.dumps({'status': 'error', 'message': 'Payoffs inference returned no data'})}\n\n"
+            # Payoffs and behaviour shares run concurrently over chunks of actors (see pipeline.py)
+            for event in iter_landscape(problem, actors, system_objective):
+                progress = 5 + int(90 * event['done'] / max(event['total'], 1))
+                if event['stage'] == 'payoff_row':
+                    # Streamed as soon as the row is parsed; behaviour shares follow in a later partial_result
+                    for actor in event['actors']:
+                        yield f"data: {json.dumps({'status': 'partial_result', 'actor': actor.model_dump(), 'progress': progress})}\n\n"
+                elif event['stage'] == 'payoffs':
+                    yield f"data: {json.dumps({'status': 'progress', 'message': 'Calculating behaviour shares...', 'progress': progress})}\n\n"
+                elif event['stage'] == 'behavior_shares':
+                    for actor in event['actors']:
+                        yield f"data: {json.dumps({'status': 'partial_result', 'actor': actor.model_dump(), 'progress': progress})}\n\n"
+                elif event['stage'] == 'complete':
+                    results['payoffs_table'] = PayoffsResponse(actors=event['actors'])
+                    results['payoffs_table_error'] = False
+                    print("Payoffs and behavior shares inference successful")
+                    yield f"data: {json.dumps({'status': 'complete', 'message': 'Payoffs calculation complete!', 'progress': 100})}\n\n"
+                else:
+                    results['payoffs_table_error'] = True
+                    yield f"data: {json.dumps({'status': 'error', 'message': event['message']})}\n\n"
                 
         except Exception as e:
             print(f"Error during payoffs inference: {e}")
             results['payoffs_table_error'] = True
             yield f"data: {json.dumps({'status': 'error', 'message': str(e)})}\n\n"
+        finally:
+            # The response (and after_request) went out before the stream started, so save here
+            save_session_state()
     
-    return Response(generate(), mimetype='text/event-stream')
+    return Response(stream_with_context(generate()), mimetype='text/event-stream')
 
 def infer_payoffs_non_stream():
     """Non-streaming version (your existing code)"""
+    from api.openai.infer_payoffs import PayoffsResponse
+    from api.openai.pipeline import infer_landscape
+    
     if results.get('actors_table'):
         print("\n--- INFERRING PAYOFFS ---")
         
-        # Convert actors data to JSON string for the API
-        actors_json = json.dumps([actor.model_dump() for actor in results['actors_table'].actors], indent=2)
+        actors = [actor.model_dump() for actor in results['actors_table'].actors]
         problem = results.get('problem', '')
         
         # Get the selected system objective
@@ -267,40 +290,13 @@ def infer_payoffs_non_stream():
             except (IndexError, AttributeError):
                 print("Could not retrieve system objective, using default")
         
-        # Call the payoffs inference API
-        from api.openai.infer_payoffs import infer_payoffs
+        # Payoffs and behaviour shares run concurrently over chunks of actors (see pipeline.py)
         try:
-            payoffs_data = infer_payoffs(problem, actors_json, system_objective)
+            payoffs_data = infer_landscape(problem, actors, system_objective)
             if payoffs_data:
-                # Create a simple container object to match the template expectations
-                class PayoffsContainer:
-                    def __init__(self, actors):
-                        self.actors = actors
-                
-                results['payoffs_table'] = PayoffsContainer(payoffs_data)
+                results['payoffs_table'] = PayoffsResponse(actors=payoffs_data)
                 results['payoffs_table_error'] = False
-                print("Payoffs inference successful")
-                
-                # AUTOMATICALLY CALCULATE BEHAVIOR SHARES
-                print("\n--- AUTO-INFERRING BEHAVIOR SHARES ---")
-                
-                # Call the behavior shares inference API
-                from api.openai.infer_behavior_shares import infer_behavior_shares as infer_behavior_shares_fn
-                try:
-                    actors_with_behavior_shares = infer_behavior_shares_fn(problem, payoffs_data, epoch=0)
-                    
-                    if actors_with_behavior_shares:
-                        results['payoffs_table'] = PayoffsContainer(actors_with_behavior_shares)
-                        print("Behavior shares inference successful")
-                    else:
-                        print("Behavior shares inference returned no data, keeping payoffs data")
-                        
-                except Exception as e:
-                    print(f"Error during automatic behavior shares inference: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    print("Continuing with payoffs data only")
-                
+                print("Payoffs and behavior shares inference successful")
             else:
                 results['payoffs_table_error'] = True
                 print("Payoffs inference returned no data")
@@ -414,7 +410,7 @@ def get_simulation_data():
 
 @app.route('/store_simulation_results', methods=['POST'])
 def store_simulation_results():
-    """Store simulation results in the results dictionary"""
+    """Store simulation results in this session's state"""
     try:
         data = request.get_json()
         if not data:
@@ -0,0 +1,224 @@
+"""
+optima_store.py
+Persistent catalogue of optima from Stage 8 of math_algo.md.
+
+Each time a run hits its target, we record the epoch, the share roster, the
+payoffs, weights and incentives in force, and the incentive cost (the
+cumulative spend, see `incentive_spend`). Records go
+into a SQLite file keyed by a hash of the landscape and simulation parameters.
+Within one landscape, share vectors that fall in the same grid cell (see
+`share_tolerance`) are treated as one optimum, and only the cheapest is kept.
+Indexes on cost and epoch make "cheapest under budget" and "fewest epochs"
+queries cheap, however many optima are stored.
+"""
+
+import hashlib
+import sqlite3
+import time
+from typing import Iterable, List, Optional
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from simulation import BatchSimulationResult, SimulationResult
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS optima (
+    id INTEGER PRIMARY KEY,
+    landscape_key TEXT NOT NULL,
+    share_key TEXT NOT NULL,
+    epoch INTEGER NOT NULL,
+    final_P REAL NOT NULL,
+    incentive_cost REAL NOT NULL,
+    n_actors INTEGER NOT NULL,
+    n_strategies INTEGER NOT NULL,
+    shares BLOB NOT NULL,
+    payoffs BLOB NOT NULL,
+    weights BLOB NOT NULL,
+    incentives BLOB,
+    created_at REAL NOT NULL,
+    UNIQUE (landscape_key, share_key)
+);
+CREATE INDEX IF NOT EXISTS optima_by_cost ON optima (landscape_key, incentive_cost);
+CREATE INDEX IF NOT EXISTS optima_by_epoch ON optima (landscape_key, epoch, incentive_cost);
+"""
+
+# Keep the cheapest (then fastest) record for each near-equal share vector
+_UPSERT = """
+INSERT INTO optima (landscape_key, share_key, epoch, final_P, incentive_cost, n_actors, n_strategies,
+                    shares, payoffs, weights, incentives, created_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (landscape_key, share_key) DO UPDATE SET
+    epoch = excluded.epoch,
+    final_P = excluded.final_P,
+    incentive_cost = excluded.incentive_cost,
+    shares = excluded.shares,
+    payoffs = excluded.payoffs,
+    weights = excluded.weights,
+    incentives = excluded.incentives,
+    created_at = excluded.created_at
+WHERE excluded.incentive_cost < optima.incentive_cost
+   OR (excluded.incentive_cost = optima.incentive_cost AND excluded.epoch < optima.epoch)
+"""
+
+
+class Optimum(BaseModel):
+    epoch: int = Field(description="Epoch when the target was first hit")
+    final_P: float = Field(description="Headline metric at that epoch")
+    incentive_cost: float = Field(description="Cumulative incentive spend up to the optimum: "
+                                              "Σ_t Σ_gk incentive[g,k] * share[g,k,t] over epochs 0..epoch")
+    shares: np.ndarray = Field(description="Strategy shares [actor][strategy]")
+    payoffs: np.ndarray = Field(description="Payoffs [actor][strategy]")
+    weights: np.ndarray = Field(description="Weights [actor][strategy]")
+    incentives: Optional[np.ndarray] = Field(default=None, description="π-matrix in force [actor][strategy]")
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
+def landscape_key(delta_raw: np.ndarray, private_cost: np.ndarray, weight: np.ndarray, payoff_base: np.ndarray,
+                  initial_shares: np.ndarray, P_baseline: float, P_target: float, max_epochs: int,
+                  learning_rate: float) -> str:
+    """Hash a parsed landscape plus simulation parameters into a catalogue key."""
+    digest = hashlib.sha256()
+    for array in (delta_raw, private_cost, weight, payoff_base, initial_shares):
+        array = np.ascontiguousarray(array, dtype=np.float64)
+        digest.update(repr(array.shape).encode())
+        digest.update(array.tobytes())
+    digest.update(repr((float(P_baseline), float(P_target), int(max_epochs), float(learning_rate))).encode())
+    return digest.hexdigest()
+
+
+def incentive_spend(share_history: np.ndarray, incentive: Optional[np.ndarray]) -> float:
+    """
+    Running total of incentives paid: Σ_t Σ_gk incentive[g,k] * share[g,k,t].
+
+    This is the one definition of `incentive_cost` in the catalogue; batches
+    get the same number from their `cumulative_share` (see `add_batch`).
+    """
+    if incentive is None:
+        return 0.0
+    return float(np.einsum('gkt,gk->', share_history, incentive))
+
+
+class OptimaStore:
+    """SQLite-backed optima catalogue. Use as a context manager or call `close()`."""
+
+    def __init__(self, path: str, share_tolerance: float = 1e-3):
+        self.path = path
+        self.share_tolerance = share_tolerance
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+    def _share_key(self, shares: np.ndarray) -> str:
+        cells = np.round(np.asarray(shares, dtype=np.float64) / self.share_tolerance).astype(np.int64)
+        return hashlib.sha1(cells.tobytes()).hexdigest()
+
+    def _row(self, key: str, epoch: int, final_P: float, incentive_cost: float, shares: np.ndarray,
+             payoffs: np.ndarray, weights: np.ndarray, incentives: Optional[np.ndarray], now: float) -> tuple:
+        G, K = shares.shape
+        return (
+            key, self._share_key(shares), int(epoch), float(final_P), float(incentive_cost), G, K,
+            np.asarray(shares, dtype=np.float64).tobytes(),
+            np.asarray(payoffs, dtype=np.float64).tobytes(),
+            np.asarray(weights, dtype=np.float64).tobytes(),
+            None if incentives is None else np.asarray(incentives, dtype=np.float64).tobytes(),
+            now
+        )
+
+    def add(self, key: str, epoch: int, final_P: float, shares: np.ndarray, payoffs: np.ndarray,
+            weights: np.ndarray, incentives: Optional[np.ndarray] = None, incentive_cost: float = 0.0):
+        """Record one optimum, replacing a near-equal one only if this is cheaper."""
+        with self._conn:
+            self._conn.execute(_UPSERT, self._row(key, epoch, final_P, incentive_cost, shares, payoffs,
+                                                  weights, incentives, time.time()))
+
+    def add_simulation(self, key: str, result: SimulationResult, weights: np.ndarray,
+                       incentives: Optional[np.ndarray] = None) -> bool:
+        """Record the optimum from a single run; returns False if the target was not hit."""
+        if result.t_hit is None:
+            return False
+        if incentives is not None and len(result.epochs) != result.t_hit + 1:
+            raise ValueError("Incentive spend needs the full share history (run with record='full')")
+        # The run stops at t_hit, so the final recorded column is the optimum
+        self.add(key, result.t_hit, result.P_series[result.t_hit], result.share[:, :, -1],
+                 result.payoff[:, :, -1], weights, incentives, incentive_spend(result.share, incentives))
+        return True
+
+    def add_batch(self, key: str, result: BatchSimulationResult, weights: np.ndarray,
+                  incentives: Optional[np.ndarray] = None,
+                  incentive_costs: Optional[Iterable[float]] = None) -> int:
+        """
+        Record every scenario in a batch that hit its target, in one transaction.
+
+        `incentives` is (G, K) or (S, G, K). `incentive_costs` is per scenario and
+        defaults to each scenario's cumulative spend, Σ_gk incentive * cumulative_share,
+        the same quantity `add_simulation` records; costs passed in must use that
+        definition too. Defaulted costs need a batch run with
+        `record_cumulative_share=True`. Returns the number of hits offered.
+        """
+        hits = np.flatnonzero(result.t_hit >= 0)
+        S = len(result.t_hit)
+        if incentives is not None:
+            incentives = np.broadcast_to(incentives, (S,) + result.final_share.shape[1:])
+        if incentive_costs is None:
+            if incentives is not None and result.cumulative_share is None:
+                raise ValueError("Incentive spend needs the cumulative shares (run with record_cumulative_share=True)")
+            incentive_costs = (np.zeros(S) if incentives is None
+                               else np.einsum('sgk,sgk->s', result.cumulative_share, incentives))
+        incentive_costs = np.asarray(list(incentive_costs), dtype=float)
+        weights = np.broadcast_to(weights, result.final_share.shape)
+
+        now = time.time()
+        rows = (
+            self._row(key, result.t_hit[s], result.final_P[s], incentive_costs[s], result.final_share[s],
+                      result.final_payoff[s], weights[s], None if incentives is None else incentives[s], now)
+            for s in hits
+        )
+        with self._conn:
+            self._conn.executemany(_UPSERT, rows)
+        return len(hits)
+
+    def _query(self, sql: str, params: tuple) -> List[Optimum]:
+        columns = "epoch, final_P, incentive_cost, n_actors, n_strategies, shares, payoffs, weights, incentives"
+        optima = []
+        for epoch, final_P, cost, G, K, shares, payoffs, weights, incentives in self._conn.execute(
+                f"SELECT {columns} FROM optima {sql}", params):
+            optima.append(Optimum(
+                epoch=epoch,
+                final_P=final_P,
+                incentive_cost=cost,
+                shares=np.frombuffer(shares).reshape(G, K),
+                payoffs=np.frombuffer(payoffs).reshape(G, K),
+                weights=np.frombuffer(weights).reshape(G, K),
+                incentives=None if incentives is None else np.frombuffer(incentives).reshape(G, K)
+            ))
+        return optima
+
+    def cheapest_under_budget(self, key: str, budget: float, limit: int = 1) -> List[Optimum]:
+        """Cheapest optima whose incentive cost is at most `budget`."""
+        return self._query("WHERE landscape_key = ? AND incentive_cost <= ? ORDER BY incentive_cost, epoch LIMIT ?",
+                           (key, budget, limit))
+
+    def fewest_epochs(self, key: str, limit: int = 1, budget: Optional[float] = None) -> List[Optimum]:
+        """Fastest optima, optionally restricted to an incentive budget."""
+        if budget is None:
+            return self._query("WHERE landscape_key = ? ORDER BY epoch, incentive_cost LIMIT ?", (key, limit))
+        return self._query("WHERE landscape_key = ? AND incentive_cost <= ? ORDER BY epoch, incentive_cost LIMIT ?",
+                           (key, budget, limit))
+
+    def count(self, key: Optional[str] = None) -> int:
+        """Number of distinct optima stored, for one landscape or overall."""
+        if key is None:
+            return self._conn.execute("SELECT COUNT(*) FROM optima").fetchone()[0]
+        return self._conn.execute("SELECT COUNT(*) FROM optima WHERE landscape_key = ?", (key,)).fetchone()[0]
@@ -0,0 +1,219 @@
+"""
+optimise_incentives.py
+Search for the cheapest incentive (π) matrix that makes the target reachable,
+following Stages 6–7 of math_algo.md.
+
+A subsidy incentive[g, k] is taken off the private cost of strategy k for
+actor g, which lifts its base payoff by the same amount. The cost of a
+π-matrix is what it pays out until the target is hit, Σ_t Σ_gk π·share:
+the same `incentive_cost` the optima catalogue records (see
+optima_store.incentive_spend), and what `budget` limits. Only each actor's
+most effective strategy (if it moves the metric towards the target) is
+subsidised.
+
+Every candidate is simulated through `simulate_batch_arrays`, many candidates
+at a time, and results are memoised so that no π-matrix is simulated twice.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from simulation import LEARNING_RATE, parse_rows_to_arrays, simulate_batch_arrays
+
+
+class IncentiveSearchResult(BaseModel):
+    reachable: bool = Field(description="Whether any π-matrix within budget reaches the target")
+    incentive: Optional[np.ndarray] = Field(default=None, description="Cheapest π-matrix found [actor][strategy]")
+    cost: Optional[float] = Field(default=None, description="Incentives paid until t_hit, Σ_t Σ_gk π·share")
+    t_hit: Optional[int] = Field(default=None, description="Epoch when the target is hit under the π-matrix")
+    evaluations: int = Field(description="Number of distinct π-matrices simulated")
+    sector_names: List[str] = Field(description="Actor names, in π-matrix row order")
+    strategy_ids: List[str] = Field(description="Strategy labels, in π-matrix column order")
+
+    class Config:
+        arbitrary_types_allowed = True
+
+
+class IncentiveEvaluator:
+    """Cached, vectorised evaluation of candidate π-matrices on one landscape."""
+
+    def __init__(self, delta_raw: np.ndarray, payoff_base: np.ndarray, initial_shares: np.ndarray,
+                 P_baseline: float, P_target: float, max_epochs: int, learning_rate: float = LEARNING_RATE,
+                 decimals: int = 9):
+        self.delta_raw = delta_raw
+        self.payoff_base = payoff_base
+        self.initial_shares = initial_shares
+        self.P_baseline = P_baseline
+        self.P_target = P_target
+        self.max_epochs = max_epochs
+        self.learning_rate = learning_rate
+        self.decimals = decimals
+        self._cache: Dict[bytes, Tuple[int, float]] = {}
+
+    @property
+    def evaluations(self) -> int:
+        return len(self._cache)
+
+    def t_hit(self, candidates: np.ndarray) -> np.ndarray:
+        """Return t_hit (-1 if not reached) for an (N, G, K) stack of π-matrices."""
+        return self.evaluate(candidates)[0]
+
+    def evaluate(self, candidates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (t_hit, spend) for an (N, G, K) stack of π-matrices; spend is Σ_t Σ_gk π·share."""
+        candidates = np.round(np.asarray(candidates, dtype=float), self.decimals)
+        keys = [candidate.tobytes() for candidate in candidates]
+
+        # Simulate each unseen candidate once, all in one batch
+        pending = {}
+        for key, candidate in zip(keys, candidates):
+            if key not in self._cache and key not in pending:
+                pending[key] = candidate
+        if pending:
+            stacked = np.stack(list(pending.values()))
+            result = simulate_batch_arrays(
+                self.delta_raw, self.payoff_base + stacked, self.initial_shares,
+                self.P_baseline, self.P_target, self.max_epochs, self.learning_rate, record_series=False,
+                record_cumulative_share=True
+            )
+            spend = np.einsum('sgk,sgk->s', result.cumulative_share, stacked)
+            self._cache.update(zip(pending.keys(), zip(result.t_hit.tolist(), spend.tolist())))
+
+        t_hit, spend = zip(*(self._cache[key] for key in keys))
+        return np.array(t_hit, dtype=int), np.array(spend)
+
+
+def _uniform_level(evaluator: IncentiveEvaluator, mask: np.ndarray, max_level: float,
+                   grid_size: int, tolerance: float) -> Optional[float]:
+    """Smallest per-cell subsidy, applied to every cell in `mask`, that reaches the target."""
+    if evaluator.t_hit((mask * max_level)[np.newaxis])[0] < 0:
+        return None
+
+    # Multi-section search: each round simulates a whole grid of levels at once
+    low, high = 0.0, max_level
+    while high - low > tolerance * max_level:
+        levels = np.linspace(low, high, grid_size + 2)[1:-1]
+        hits = evaluator.t_hit(levels[:, np.newaxis, np.newaxis] * mask) >= 0
+        if hits.any():
+            first = int(np.argmax(hits))
+            high = levels[first]
+            low = levels[first - 1] if first > 0 else low
+        else:
+            low = levels[-1]
+    return high
+
+
+def _coordinate_descent(evaluator: IncentiveEvaluator, incentive: np.ndarray, min_step: float,
+                        max_rounds: int) -> np.ndarray:
+    """Greedily shrink individual subsidies while the target stays reachable and the spend falls."""
+    # A smaller subsidy can slow the run down enough to pay out more in total
+    cost = evaluator.evaluate(incentive[np.newaxis])[1][0]
+    step = 0.5
+    for _ in range(max_rounds):
+        if step < min_step:
+            break
+        cells = np.argwhere(incentive > 0)
+        if len(cells) == 0:
+            break
+
+        # One candidate per (cell, reduction) pair, evaluated as a single batch
+        fractions = np.array([0.0, 1 - step])
+        candidates = np.repeat(incentive[np.newaxis], len(cells) * len(fractions), axis=0)
+        for i, (g, k) in enumerate(cells):
+            for j, fraction in enumerate(fractions):
+                candidates[i * len(fractions) + j, g, k] *= fraction
+
+        t_hit, spend = evaluator.evaluate(candidates)
+        costs = np.where(t_hit >= 0, spend, np.inf)
+        best = int(np.argmin(costs))
+        if costs[best] >= cost:
+            step /= 2
+            continue
+        incentive, cost = candidates[best], costs[best]
+
+    return incentive
+
+
+def optimise_incentives(rows: List[List], P_baseline: float, P_target: float, max_epochs: int,
+                        budget: float, learning_rate: float = LEARNING_RATE, grid_size: int = 16,
+                        tolerance: float = 1e-3, min_step: float = 1e-2, max_rounds: int = 200) -> IncentiveSearchResult:
+    """
+    Find the cheapest π-matrix (spend at most `budget`) that reaches the target.
+
+    The search first finds the cheapest uniform subsidy on each actor's most
+    effective strategy, then runs coordinate descent that zeroes or shrinks one
+    cell at a time, keeping the cheapest candidate that still hits the target.
+    Costs are cumulative spend, Σ_t Σ_gk π·share up to t_hit (see module docstring).
+
+    Parameters
+    ----------
+    rows : List[List]
+        Landscape rows, as accepted by `run_simulation`.
+    budget : float
+        Maximum spend, Σ_t Σ_gk π·share up to t_hit.
+    grid_size : int
+        Subsidy levels simulated together in each round of the uniform search.
+    tolerance : float
+        Relative precision of the uniform subsidy level.
+    min_step : float
+        Smallest relative reduction tried on a single cell before stopping.
+
+    Returns
+    -------
+    IncentiveSearchResult
+        The π-matrix, its cost and t_hit, and the number of evaluations used.
+        Pass `incentive` to `run_simulation` to re-simulate the full history.
+    """
+    if not rows:
+        raise ValueError("No data provided for incentive search")
+    if budget < 0:
+        raise ValueError("Incentive budget cannot be negative")
+
+    delta_raw, _, _, payoff_base, initial_shares, sector_names, strategy_ids = parse_rows_to_arrays(rows)
+    evaluator = IncentiveEvaluator(delta_raw, payoff_base, initial_shares, P_baseline, P_target,
+                                   max_epochs, learning_rate)
+
+    def result(incentive: Optional[np.ndarray]) -> IncentiveSearchResult:
+        if incentive is None:
+            return IncentiveSearchResult(reachable=False, evaluations=evaluator.evaluations,
+                                         sector_names=sector_names, strategy_ids=strategy_ids)
+        t_hit, spend = evaluator.evaluate(incentive[np.newaxis])
+        return IncentiveSearchResult(
+            reachable=True,
+            incentive=incentive,
+            cost=float(spend[0]),
+            t_hit=int(t_hit[0]),
+            evaluations=evaluator.evaluations,
+            sector_names=sector_names,
+            strategy_ids=strategy_ids
+        )
+
+    no_incentive = np.zeros_like(payoff_base)
+    if evaluator.t_hit(no_incentive[np.newaxis])[0] >= 0:
+        return result(no_incentive)
+
+    # Subsidise each actor's most effective strategy, provided it moves the metric towards the target
+    effect = -delta_raw if P_target < P_baseline else delta_raw
+    mask = (effect == effect.max(axis=1, keepdims=True)) & (effect > 0)
+    if not mask.any() or budget == 0:
+        return result(None)
+
+    # Epoch 0 alone pays level * Σ(masked initial shares), which bounds the level the budget allows
+    opening_share = float((mask * initial_shares).sum())
+    if opening_share == 0:
+        return result(None)  # strategies with no share never gain any under the replicator update
+    max_level = budget / opening_share
+    level = _uniform_level(evaluator, mask.astype(float), max_level, grid_size, tolerance)
+    if level is None:
+        return result(None)
+
+    # Spend is not monotone in the level: a bigger subsidy can hit the target soon enough to pay out less
+    levels = np.geomspace(level, max_level, grid_size)
+    t_hit, spend = evaluator.evaluate(levels[:, np.newaxis, np.newaxis] * mask)
+    level = levels[int(np.argmin(np.where(t_hit >= 0, spend, np.inf)))]
+
+    incentive = _coordinate_descent(evaluator, mask * level, min_step, max_rounds)
+    if evaluator.evaluate(incentive[np.newaxis])[1][0] > budget:
+        return result(None)
+    return result(incentive)
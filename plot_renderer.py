@@ -0,0 +1,137 @@
+"""
+plot_renderer.py
+Render simulation plots off the request path, in a pool of worker processes.
+
+matplotlib is not thread-safe, so figures are drawn in separate processes
+(started with "spawn", so workers never inherit Flask's threads or locks).
+A finished simulation is only registered here; each plot is rendered the
+first time it is requested, and concurrent requests for the same plot share
+one render. Rendered PNGs are written to <plot_dir>/<result_id>_<kind>.png;
+the app uses the result-cache directory, and serves them from there
+(see routes_simulation.plot).
+"""
+
+import atexit
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from simulation import PLOT_RENDERERS, SimulationResult, plot_arguments
+
+PLOT_KINDS = tuple(PLOT_RENDERERS)
+
+
+def _render(kind: str, path: str, arguments: tuple) -> str:
+    """Render one plot to `path`; runs inside a worker process."""
+    # Write to a temporary name first so a half-written PNG is never served
+    tmp_path = f"{path}.{os.getpid()}.tmp.png"
+    PLOT_RENDERERS[kind](tmp_path, *arguments)
+    os.replace(tmp_path, path)
+    return path
+
+
+class PlotRenderer:
+    """
+    Lazy, deduplicated plot rendering backed by a process pool.
+
+    Parameters
+    ----------
+    plot_dir : str
+        Directory the PNGs are written to and served from.
+    max_workers : int, optional
+        Render processes; defaults to one per plot kind, capped at the CPU count.
+    max_pending : int
+        Registered results whose plots can still be rendered; the least
+        recently used are forgotten first (files already rendered are kept).
+    loader : callable, optional
+        `loader(result_id)` returning (result, P_baseline, P_target,
+        sector_names) or None, consulted for results that are not registered.
+    """
+
+    def __init__(self, plot_dir: str, max_workers: Optional[int] = None, max_pending: int = 64,
+                 loader: Optional[Callable[[str], Optional[tuple]]] = None):
+        self.plot_dir = plot_dir
+        self.loader = loader
+        self.max_workers = max_workers or min(len(PLOT_KINDS), os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending: "OrderedDict[str, Tuple[SimulationResult, float, float, List[str]]]" = OrderedDict()
+        self._renders: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # Started on first use, so importing this module never spawns processes
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(self._pool.shutdown, wait=False, cancel_futures=True)
+        return self._pool
+
+    def path(self, result_id: str, kind: str) -> str:
+        return os.path.join(self.plot_dir, f"{result_id}_{kind}.png")
+
+    def register(self, result_id: str, result: SimulationResult, P_baseline: float, P_target: float,
+                 sector_names: List[str]):
+        """Make a finished simulation's plots available for rendering on demand."""
+        with self._lock:
+            self._pending[result_id] = (result, P_baseline, P_target, sector_names)
+            self._pending.move_to_end(result_id)
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+
+    def is_registered(self, result_id: str) -> bool:
+        with self._lock:
+            return result_id in self._pending
+
+    def render(self, result_id: str, kind: str, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Return the path of a rendered plot, rendering it first if needed.
+
+        Blocks until the render finishes. Returns None if the plot was never
+        rendered and its result is neither registered nor available from `loader`.
+        """
+        if kind not in PLOT_KINDS:
+            raise ValueError(f"Unknown plot kind '{kind}', expected one of {list(PLOT_KINDS)}")
+
+        path = self.path(result_id, kind)
+        key = (result_id, kind)
+        with self._lock:
+            future = self._renders.get(key)
+            if future is None:
+                if os.path.exists(path):
+                    return path
+                pending = self._pending.get(result_id)
+
+        if future is None:
+            # Results registered before a restart (or evicted here) can come back from the loader
+            if pending is None and self.loader is not None:
+                pending = self.loader(result_id)
+            if pending is None:
+                return None
+
+            submitted = False
+            with self._lock:
+                # Another request may have started the same render meanwhile
+                future = self._renders.get(key)
+                if future is None and os.path.exists(path):
+                    return path
+                if future is None:
+                    os.makedirs(self.plot_dir, exist_ok=True)
+                    result, P_baseline, P_target, sector_names = pending
+                    arguments = plot_arguments(kind, result, P_baseline, P_target, sector_names)
+                    future = self._executor().submit(_render, kind, path, arguments)
+                    self._renders[key] = future
+                    submitted = True
+
+            if submitted:
+                # Outside the lock: the callback runs immediately if the render already finished
+                future.add_done_callback(lambda _: self._forget(key))
+
+        return future.result(timeout)
+
+    def _forget(self, key: Tuple[str, str]):
+        with self._lock:
+            self._renders.pop(key, None)
@@ -0,0 +1,225 @@
+"""
+result_cache.py
+Content-addressed cache of simulation results and their plots.
+
+A result is keyed by a hash of the parsed landscape (so formatting differences
+in the submitted rows do not matter) and every parameter that changes the
+simulation. The key doubles as the result id, so a repeated request maps to
+the same stored arrays and the same plot files. Each entry is a set of files
+sharing the key as prefix:
+
+    <key>.npz          P_series, recorded epochs, share and payoff histories
+    <key>.json         response body and plotting metadata
+    <key>_<kind>.png   plots, written by plot_renderer.PlotRenderer
+    <key>.error        why the last attempt to compute the result failed, if it did
+
+Entries are evicted least-recently-used first (by file mtime, refreshed on
+every hit) once the directory grows past `max_bytes`. The directory size is
+tracked as a running total, seeded by one scan and updated by `put` and
+`evict`, so a write only scans the directory when the total goes over the cap.
+Plots and other processes' writes are not seen by the total, so it is also
+re-read from disk every RESCAN_SECONDS.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from simulation import SimulationResult, parse_rows_to_arrays
+
+CACHE_DIR = "cache/simulations"
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+RESCAN_SECONDS = 300.0  # longest time the running size total goes without a rescan
+
+# Keys are the hex digests made by `simulation_key`; nothing else may name a file in the cache
+KEY_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+# Parameters of a /simulate request that change its result
+KEY_PARAMS = ("P_baseline", "P_target", "max_epochs", "scale", "stall_tolerance",
+              "record", "record_every", "record_last")
+
+
+def simulation_key(rows: List[List], params: Dict) -> str:
+    """Hash the canonicalised landscape and simulation parameters into a result id."""
+    delta_raw, private_cost, weight, payoff_base, initial_shares, sector_names, strategy_ids = parse_rows_to_arrays(rows)
+
+    digest = hashlib.sha256()
+    for array in (delta_raw, private_cost, weight, payoff_base, initial_shares):
+        array = np.ascontiguousarray(array, dtype=np.float64)
+        digest.update(repr(array.shape).encode())
+        digest.update(array.tobytes())
+    canonical = {
+        "sector_names": [str(name) for name in sector_names],
+        "strategy_ids": [str(strategy_id) for strategy_id in strategy_ids],
+        "params": {name: params.get(name) for name in KEY_PARAMS}
+    }
+    digest.update(json.dumps(canonical, sort_keys=True).encode())
+    return digest.hexdigest()[:32]
+
+
+def is_valid_key(key) -> bool:
+    """Whether `key` has the form of a `simulation_key`, and so is safe to use as a file name."""
+    return isinstance(key, str) and KEY_PATTERN.fullmatch(key) is not None
+
+
+class ResultCache:
+    """
+    On-disk simulation results and plots, addressed by `simulation_key`.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory holding every entry's files.
+    max_bytes : int
+        Size cap for the directory; least recently used entries go first.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        with self._lock:
+            self._scan()
+
+    def _scan(self) -> Dict[str, List]:
+        """key -> [size, last used, paths] for every entry on disk; resets the running total. Call with the lock held."""
+        entries: Dict[str, List] = {}
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_file() or entry.name.endswith(".tmp") or entry.name.startswith("."):
+                continue
+            key = entry.name.split(".")[0].split("_")[0]
+            stat = entry.stat()
+            record = entries.setdefault(key, [0, 0.0, []])
+            record[0] += stat.st_size
+            record[1] = max(record[1], stat.st_mtime)
+            record[2].append(entry.path)
+        self._total_bytes = sum(size for size, _, _ in entries.values())
+        self._scanned_at = time.monotonic()
+        return entries
+
+    @staticmethod
+    def _size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except FileNotFoundError:
+            return 0
+
+    def _path(self, key: str, suffix: str) -> str:
+        if not is_valid_key(key):
+            raise ValueError(f"Invalid result id {key!r}")
+        return os.path.join(self.cache_dir, key + suffix)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Cached response body for `key`, refreshing the entry's LRU position; None on a miss or invalid key."""
+        if not is_valid_key(key):
+            return None
+        path = self._path(key, ".json")
+        try:
+            with open(path) as f:
+                meta = json.load(f)
+            os.utime(path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return meta["response"]
+
+    def load(self, key: str) -> Optional[Tuple[SimulationResult, float, float, List[str]]]:
+        """Stored result plus (P_baseline, P_target, sector_names), as PlotRenderer needs them."""
+        try:
+            with open(self._path(key, ".json")) as f:
+                meta = json.load(f)
+            with np.load(self._path(key, ".npz")) as arrays:
+                result = SimulationResult(
+                    P_series=arrays["P_series"],
+                    share=arrays["share"],
+                    payoff=arrays["payoff"],
+                    epochs=arrays["epochs"],
+                    t_hit=meta["t_hit"],
+                    stalled_at=meta["stalled_at"],
+                    stall_reason=meta["stall_reason"]
+                )
+        except (FileNotFoundError, KeyError, ValueError):
+            return None
+        return result, meta["P_baseline"], meta["P_target"], meta["sector_names"]
+
+    def put(self, key: str, response: Dict, result: SimulationResult, P_baseline: float, P_target: float,
+            sector_names: List[str]):
+        """Store a result and its response body, then evict old entries over the size cap."""
+        meta = {
+            "response": response,
+            "P_baseline": P_baseline,
+            "P_target": P_target,
+            "sector_names": sector_names,
+            "t_hit": result.t_hit,
+            "stalled_at": result.stalled_at,
+            "stall_reason": result.stall_reason
+        }
+
+        # Write to temporary names first; the .json appears last and marks the entry complete
+        tmp = f".{threading.get_ident()}.tmp"
+        replaced = self._size(self._path(key, ".npz")) + self._size(self._path(key, ".json"))
+        with open(self._path(key, ".npz" + tmp), "wb") as f:
+            np.savez(f, P_series=result.P_series, epochs=result.epochs, share=result.share, payoff=result.payoff)
+        os.replace(self._path(key, ".npz" + tmp), self._path(key, ".npz"))
+        with open(self._path(key, ".json" + tmp), "w") as f:
+            json.dump(meta, f)
+        os.replace(self._path(key, ".json" + tmp), self._path(key, ".json"))
+        self.clear_error(key)
+
+        added = self._size(self._path(key, ".npz")) + self._size(self._path(key, ".json"))
+        with self._lock:
+            self._total_bytes += added - replaced
+        self.evict()
+
+    def put_error(self, key: str, message: str):
+        """Record that computing `key` failed, so other processes waiting for it can stop."""
+        tmp = self._path(key, f".error.{threading.get_ident()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"error": message}, f)
+        os.replace(tmp, self._path(key, ".error"))
+
+    def get_error(self, key: str) -> Optional[str]:
+        """The recorded failure for `key`, or None."""
+        if not is_valid_key(key):
+            return None
+        try:
+            with open(self._path(key, ".error")) as f:
+                return json.load(f)["error"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def clear_error(self, key: str):
+        try:
+            os.remove(self._path(key, ".error"))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """
+        Delete least recently used entries until the cache fits in `max_bytes`.
+
+        A no-op while the running total is under the cap and was last checked
+        against the disk within RESCAN_SECONDS; otherwise the directory is scanned.
+        """
+        with self._lock:
+            if self._total_bytes <= self.max_bytes and time.monotonic() - self._scanned_at < RESCAN_SECONDS:
+                return
+            entries = self._scan()
+
+            total = self._total_bytes
+            for key, (size, _, paths) in sorted(entries.items(), key=lambda item: item[1][1]):
+                if total <= self.max_bytes:
+                    break
+                for path in paths:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+            self._total_bytes = total
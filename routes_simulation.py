@@ -1,41 +1,100 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, url_for, send_file, abort
 import json
 import os
-from simulation import run_simulation, generate_plots, SimulationResult
+import time
+from simulation import run_simulation, SimulationResult
+from simulation_jobs import JobQueue
+from plot_renderer import PlotRenderer, PLOT_KINDS
+from result_cache import ResultCache, is_valid_key, simulation_key
 
 sim_bp = Blueprint('simulation', __name__)
 
-@sim_bp.route('/simulate', methods=['POST'])
-def simulate():
-    """Run evolutionary game theory simulation."""
-    try:
-        # Parse JSON payload
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "No JSON data provided"}), 400
-        
-        rows = data.get('rows', [])
-        P_baseline = float(data.get('P_baseline', 100.0))
-        P_target = float(data.get('P_target', 85.0))
-        max_epochs = int(data.get('max_epochs', 50))
-        scale = data.get('scale')
-        if scale is not None:
-            scale = float(scale)
-        
-        if current_app.config.get("DEBUG"):
+# Simulations run here in the background; POST /simulate returns a job id at once
+jobs = JobQueue()
+
+# Results and plots are stored under a hash of their inputs, so repeated runs are a lookup
+cache = ResultCache()
+
+# Plots are rendered in worker processes the first time /plots/<result_id>/<kind> is fetched
+renderer = PlotRenderer(plot_dir=cache.cache_dir, loader=cache.load)
+
+def parse_simulation_request(data: dict) -> dict:
+    """Read and validate simulation parameters from a /simulate JSON payload."""
+    params = {
+        'rows': data.get('rows', []),
+        'P_baseline': float(data.get('P_baseline', 100.0)),
+        'P_target': float(data.get('P_target', 85.0)),
+        'max_epochs': int(data.get('max_epochs', 50)),
+        'scale': data.get('scale'),
+        'stall_tolerance': data.get('stall_tolerance'),
+        'record': data.get('record', 'full'),
+        'record_every': int(data.get('record_every', 10)),
+        'record_last': int(data.get('record_last', 100)),
+        'render': data.get('render', 'server'),
+        'max_points': int(data.get('max_points', 500))
+    }
+    if params['scale'] is not None:
+        params['scale'] = float(params['scale'])
+    if params['stall_tolerance'] is not None:
+        params['stall_tolerance'] = float(params['stall_tolerance'])
+    
+    # Validate input
+    if not params['rows']:
+        raise ValueError("No strategy data provided")
+    if params['P_baseline'] == params['P_target']:
+        raise ValueError("Baseline and target cannot be equal")
+    if params['render'] not in ('server', 'client'):
+        raise ValueError(f"Unknown render mode '{params['render']}', expected 'server' or 'client'")
+    if params['max_points'] < 2:
+        raise ValueError("max_points must be at least 2 (the first and last epochs are always kept)")
+    return params
+
+def plot_urls(result_id: str) -> dict:
+    """URLs of a result's plots, keyed as in the /simulate response."""
+    return {f'{kind}_plot': url_for('simulation.plot', result_id=result_id, kind=kind) for kind in PLOT_KINDS}
+
+def simulate_and_plot(params: dict, result_id: str, urls: dict, debug: bool = False, progress_callback=None) -> dict:
+    """
+    Run a simulation and build the /simulate response body.
+    
+    `result_id` is the content hash of the inputs: a cached result is returned
+    without simulating. With render "server", plots are not drawn here: the
+    result is registered with the renderer and each plot is rendered when its
+    URL (from `urls`) is first fetched. With render "client", the response
+    carries the series themselves (see SimulationResult.to_compact) instead.
+    """
+    rows = params['rows']
+    P_baseline, P_target, max_epochs = params['P_baseline'], params['P_target'], params['max_epochs']
+    
+    response = cache.get(result_id)
+    cached = response is not None
+    result = None
+    if cached and params['render'] == 'client':
+        loaded = cache.load(result_id)
+        if loaded is None:
+            cached = False  # evicted since the lookup
+        else:
+            result, _, _, sector_names = loaded
+    
+    if cached:
+        if debug:
+            print(f"Simulation cache hit: {result_id}")
+    else:
+        if debug:
             print(f"Running simulation: baseline={P_baseline}, target={P_target}, epochs={max_epochs}")
             print(f"Number of rows: {len(rows)}")
             print(f"Sample row: {rows[0] if rows else 'None'}")
         
-        # Validate input
-        if not rows:
-            return jsonify({"error": "No strategy data provided"}), 400
-        
-        if P_baseline == P_target:
-            return jsonify({"error": "Baseline and target cannot be equal"}), 400
+        epoch_callback = None
+        if progress_callback is not None:
+            def epoch_callback(t, P_t, progress_made):
+                progress_callback(epoch=t, max_epochs=max_epochs, P_t=P_t, progress=round(progress_made * 100, 1))
         
         # Run simulation
-        result = run_simulation(rows, P_baseline, P_target, max_epochs, scale)
+        result = run_simulation(rows, P_baseline, P_target, max_epochs, params['scale'],
+                                stall_tolerance=params['stall_tolerance'], record=params['record'],
+                                record_every=params['record_every'], record_last=params['record_last'],
+                                progress_callback=epoch_callback)
         
         # Extract sector names for plotting
         sector_names = []
@@ -47,42 +106,206 @@ def simulate():
                     sector_names.append(sector)
                     seen_sectors.add(sector)
         
-        # Generate plots
-        plot1, plot2, plot3 = generate_plots(result, P_baseline, P_target, sector_names)
-        
-        if current_app.config.get("DEBUG"):
+        if debug:
             print(f"Simulation completed: t_hit={result.t_hit}, final_P={result.P_series[-1]:.3f}")
         
-        # Return JSON response
-        return jsonify({
+        response = {
             "success": True,
             "t_hit": result.t_hit,
-            "final_value": result.P_series[-1],
+            "stalled_at": result.stalled_at,
+            "stall_reason": result.stall_reason,
+            "final_value": float(result.P_series[-1]),
             "total_epochs": len(result.P_series),
-            "plot_files": {
-                'metric_plot': plot1,
-                'shares_plot': plot2,
-                'payoffs_plot': plot3
-            },
+            "result_id": result_id,
             "simulation_params": {
                 'P_baseline': P_baseline,
                 'P_target': P_target,
                 'max_epochs': max_epochs,
                 'actual_epochs': len(result.P_series)
             }
-        })
+        }
+    
+    series = None
+    if params['render'] == 'client':
+        series = {**result.to_compact(params['max_points']), "sector_names": sector_names}
+    # Stored only once the response is built, so a job that fails leaves no result behind
+    if not cached:
+        cache.put(result_id, response, result, P_baseline, P_target, sector_names)
+    if series is not None:
+        return {**response, "cached": cached, "series": series}
+    
+    # Plots are rendered lazily, outside this request (cached results are reloaded by the renderer)
+    if result is not None:
+        renderer.register(result_id, result, P_baseline, P_target, sector_names)
+    return {**response, "cached": cached, "plot_urls": urls}
+
+def simulate_job(params: dict, result_id: str, urls: dict, debug: bool = False, progress_callback=None) -> dict:
+    """`simulate_and_plot` as a queued job: a failure is also recorded in the shared cache for other workers."""
+    try:
+        return simulate_and_plot(params, result_id, urls, debug=debug, progress_callback=progress_callback)
+    except Exception as e:
+        try:
+            cache.put_error(result_id, str(e))
+        except OSError:
+            pass  # the job still fails locally; other workers time out as before
+        raise
+
+def parse_job_lookup(args) -> dict:
+    """Read and validate the result lookup carried by a job URL (see `simulate`)."""
+    try:
+        max_points = int(args.get('max_points', 500))
+    except (TypeError, ValueError):
+        raise ValueError("max_points must be an integer")
+    if max_points < 2:
+        raise ValueError("max_points must be at least 2 (the first and last epochs are always kept)")
+    render = args.get('render', 'server')
+    if render not in ('server', 'client'):
+        raise ValueError(f"Unknown render mode '{render}', expected 'server' or 'client'")
+    return {'result_id': args.get('result_id'), 'render': render, 'max_points': max_points}
+
+@sim_bp.route('/simulate', methods=['POST'])
+def simulate():
+    """
+    Run evolutionary game theory simulation.
+    
+    By default the simulation is queued and the response (202) carries a job id
+    plus URLs for its progress stream and result. Send "async": false to run it
+    inside the request and get the result directly.
+    """
+    debug = current_app.config.get("DEBUG")
+    try:
+        # Parse JSON payload
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No JSON data provided"}), 400
+        
+        params = parse_simulation_request(data)
+        result_id = simulation_key(params['rows'], params)
+        urls = plot_urls(result_id)
+        
+        if data.get('async', True):
+            cache.clear_error(result_id)  # a failure from an earlier attempt must not end this job
+            job_id = jobs.submit(simulate_job, params, result_id, urls, debug=debug)
+            # Another worker process may serve the follow-up requests; these let it find the result
+            lookup = {'result_id': result_id, 'render': params['render'], 'max_points': params['max_points']}
+            return jsonify({
+                "success": True,
+                "job_id": job_id,
+                "status": "queued",
+                "events_url": url_for('simulation.simulation_job_events', job_id=job_id, **lookup),
+                "result_url": url_for('simulation.simulation_job', job_id=job_id, **lookup)
+            }), 202
+        
+        return jsonify(simulate_and_plot(params, result_id, urls, debug=debug))
         
     except ValueError as e:
-        if current_app.config.get("DEBUG"):
+        if debug:
             print(f"ValueError in simulation: {e}")
         return jsonify({"error": f"Invalid input data: {str(e)}"}), 400
     except Exception as e:
-        if current_app.config.get("DEBUG"):
+        if debug:
             print(f"Error in simulation: {e}")
             import traceback
             traceback.print_exc()
         return jsonify({"error": f"Simulation failed: {str(e)}"}), 500
 
+def job_from_cache(job_id: str, args) -> dict:
+    """
+    Snapshot of a job queued in another worker process, rebuilt from the shared result cache.
+    
+    Jobs only live in the process that ran them. Under a multi-worker server
+    the follow-up requests carry the job's result id (see `simulate`), so any
+    worker can report the job as complete once its result is cached, as
+    failed once the owning worker has recorded an error, or as running until
+    then. Without a well-formed result id, the job is unknown (None). Raises
+    ValueError for an invalid lookup (see `parse_job_lookup`).
+    """
+    lookup = parse_job_lookup(args)
+    result_id = lookup['result_id']
+    if not is_valid_key(result_id):
+        return None
+    running = {"job_id": job_id, "status": "running", "progress": {}}
+    if cache.get(result_id) is None:
+        error = cache.get_error(result_id)
+        if error is not None:
+            return {"job_id": job_id, "status": "error", "progress": {}, "error": error}
+        return running
+    params = {'rows': [], 'P_baseline': None, 'P_target': None, 'max_epochs': None,
+              'render': lookup['render'], 'max_points': lookup['max_points']}
+    try:
+        result = simulate_and_plot(params, result_id, plot_urls(result_id))
+    except Exception:
+        return running  # evicted between the lookup and the load
+    return {"job_id": job_id, "status": "complete", "progress": {}, "result": result}
+
+def cached_job_events(job_id: str, args, keepalive: float = 15.0, poll_interval: float = 0.5,
+                      max_wait: float = 600.0):
+    """`JobQueue.events` stand-in for a job from another worker: waits for its result (or failure) to be cached."""
+    started = last_sent = time.monotonic()
+    while time.monotonic() - started < max_wait:
+        job = job_from_cache(job_id, args)
+        if job is None or job['status'] in ('complete', 'error'):
+            yield job
+            return
+        if time.monotonic() - last_sent >= keepalive:
+            last_sent = time.monotonic()
+            yield None
+        time.sleep(poll_interval)
+    yield {"job_id": job_id, "status": "error", "error": "Timed out waiting for the simulation result"}
+
+@sim_bp.route('/simulate/jobs/<job_id>')
+def simulation_job(job_id):
+    """Status of a simulation job, including the result once it has finished."""
+    try:
+        job = jobs.get(job_id) or job_from_cache(job_id, request.args)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid job lookup: {str(e)}"}), 400
+    if job is None:
+        return jsonify({"error": "Unknown simulation job"}), 404
+    return jsonify(job)
+
+@sim_bp.route('/simulate/jobs/<job_id>/events')
+def simulation_job_events(job_id):
+    """Stream progress of a simulation job as Server-Sent Events."""
+    local = jobs.get(job_id) is not None
+    try:
+        if not local and job_from_cache(job_id, request.args) is None:
+            return jsonify({"error": "Unknown simulation job"}), 404
+    except ValueError as e:
+        return jsonify({"error": f"Invalid job lookup: {str(e)}"}), 400
+    # Progress is only visible in the worker running the job; elsewhere, wait for the result
+    events = jobs.events(job_id) if local else cached_job_events(job_id, dict(request.args))
+    
+    def generate():
+        for job in events:
+            if job is None:
+                yield ": keepalive\n\n"
+            elif job['status'] == 'error':
+                yield f"data: {json.dumps({'status': 'error', 'message': job['error']})}\n\n"
+            elif job['status'] == 'complete':
+                yield f"data: {json.dumps({'status': 'complete', 'progress': 100, 'result': job['result']})}\n\n"
+            elif not job['progress']:
+                yield f"data: {json.dumps({'status': 'starting', 'message': 'Simulation ' + job['status'] + '...'})}\n\n"
+            else:
+                yield f"data: {json.dumps({'status': 'progress', **job['progress']})}\n\n"
+    
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@sim_bp.route('/plots/<result_id>/<kind>.png')
+def plot(result_id, kind):
+    """Serve one plot of a simulation result, rendering it on first request."""
+    if kind not in PLOT_KINDS or not is_valid_key(result_id):
+        abort(404)
+    try:
+        path = renderer.render(result_id, kind)
+    except Exception as e:
+        if current_app.config.get("DEBUG"):
+            print(f"Error rendering {kind} plot for {result_id}: {e}")
+        return jsonify({"error": f"Plot rendering failed: {str(e)}"}), 500
+    if path is None:
+        abort(404)
+    return send_file(os.path.abspath(path), mimetype='image/png', max_age=3600)
+
 # Test route to verify blueprint is working
 @sim_bp.route('/test_simulation')
 def test_simulation():
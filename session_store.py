@@ -0,0 +1,230 @@
+"""
+session_store.py
+Per-session pipeline state for the web app, kept in a pluggable store.
+
+Each browser gets a random session id in a cookie (see main.py). Its state,
+the problem text, actors, outcome targets, payoffs, analysis and simulation
+results, is serialised to JSON and saved under that id after every request
+that changes it. Nothing lives in module globals, so any worker process can
+serve any request as long as they share the store:
+
+    memory   in-process LRU; fine for a single worker
+    sqlite   a SQLite file; shared by every worker on the same host (or volume)
+
+Pydantic fields are stored with `model_dump()` and rebuilt on load. Their
+classes are imported only when a session holding them is loaded, so this
+module does not pull in LangChain.
+"""
+
+import importlib
+import json
+from abc import ABC, abstractmethod
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# State of a new (or reset) session; the problem text is filled in by the app
+DEFAULT_STATE = {
+    'problem': None,
+    'problem_submitted': False,
+    'actors_table': None,
+    'actors_table_error': False,
+    'outcome_targets': None,
+    'outcome_targets_error': False,
+    'system_objective_selected': False,
+    'selected_objective_index': None,
+    'payoffs_table': None,
+    'payoffs_table_error': False,
+    'payoffs_analysis': None,
+    'payoffs_analysis_error': False,
+    'simulation_results': None,
+    'simulation_error': False
+}
+
+# State fields holding pydantic models -> "module:Class" used to rebuild them
+MODEL_FIELDS = {
+    'actors_table': "api.openai.infer_actors:ActorsTable",
+    'outcome_targets': "api.openai.infer_outcome_target:OutcomeTargets",
+    'payoffs_table': "api.openai.infer_payoffs:PayoffsResponse",
+    'payoffs_analysis': "api.openai.analyze_payoffs:PayoffAnalysisResponse"
+}
+
+
+def new_session_id() -> str:
+    return secrets.token_urlsafe(24)
+
+
+def _model_class(path: str):
+    module, name = path.split(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def serialise_state(state: Dict) -> str:
+    """State dict -> JSON text, with pydantic fields dumped to plain dicts."""
+    data = {}
+    for field, value in state.items():
+        if field in MODEL_FIELDS and value is not None:
+            value = value.model_dump()
+        data[field] = value
+    return json.dumps(data)
+
+
+def deserialise_state(text: str) -> Dict:
+    """Inverse of `serialise_state`; unknown fields are dropped, missing ones get defaults."""
+    data = json.loads(text)
+    state = dict(DEFAULT_STATE)
+    for field in DEFAULT_STATE:
+        value = data.get(field, DEFAULT_STATE[field])
+        if field in MODEL_FIELDS and value is not None:
+            value = _model_class(MODEL_FIELDS[field]).model_validate(value)
+        state[field] = value
+    return state
+
+
+class SessionStore(ABC):
+    """Maps session ids to state, stored as `serialise_state` text."""
+
+    @abstractmethod
+    def load(self, session_id: Optional[str]) -> Optional[Dict]:
+        """The session's state, or None if the id is missing, unknown or expired."""
+
+    @abstractmethod
+    def save(self, session_id: str, state: Dict, text: Optional[str] = None) -> None:
+        """Store the session's state; pass `text` if `serialise_state(state)` is already at hand."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Forget the session; unknown ids are ignored."""
+
+
+class MemorySessionStore(SessionStore):
+    """
+    In-process store holding the `max_sessions` most recently used sessions.
+
+    Only suitable for a single worker process: other processes cannot see it.
+    """
+
+    def __init__(self, max_sessions: int = 1000):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, session_id: Optional[str]) -> Optional[Dict]:
+        if not session_id:
+            return None
+        with self._lock:
+            text = self._sessions.get(session_id)
+            if text is None:
+                return None
+            self._sessions.move_to_end(session_id)
+        return deserialise_state(text)
+
+    def save(self, session_id: str, state: Dict, text: Optional[str] = None) -> None:
+        if text is None:
+            text = serialise_state(state)
+        with self._lock:
+            self._sessions[session_id] = text
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_update ON sessions (updated_at);
+"""
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions in a SQLite file, shared by every process that opens it.
+
+    Each process opens its own connection on first use, so a store created
+    before a pre-forking server forks its workers is still safe to use.
+
+    Parameters
+    ----------
+    path : str
+        SQLite file; its directory is created if needed.
+    ttl_seconds : float, optional
+        Sessions untouched for longer than this are treated as gone and purged.
+    """
+
+    def __init__(self, path: str, ttl_seconds: Optional[float] = None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """This process's connection; call with the lock held (or before the store is shared)."""
+        if self._conn is None or self._pid != os.getpid():
+            # A connection inherited across fork must not be used (or closed) by the child
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._pid = os.getpid()
+        return self._conn
+
+    def load(self, session_id: Optional[str]) -> Optional[Dict]:
+        if not session_id:
+            return None
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT state, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        text, updated_at = row
+        if self.ttl_seconds is not None and time.time() - updated_at > self.ttl_seconds:
+            return None
+        return deserialise_state(text)
+
+    def save(self, session_id: str, state: Dict, text: Optional[str] = None) -> None:
+        if text is None:
+            text = serialise_state(state)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, state, updated_at) VALUES (?, ?, ?)",
+                (session_id, text, now)
+            )
+            if self.ttl_seconds is not None:
+                conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl_seconds,))
+
+    def delete(self, session_id: str) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+def create_session_store(backend: str, path: str, max_sessions: int = 1000,
+                         ttl_seconds: Optional[float] = None) -> SessionStore:
+    """Build the store named by `backend` ("memory" or "sqlite")."""
+    if backend == "memory":
+        return MemorySessionStore(max_sessions)
+    if backend == "sqlite":
+        return SQLiteSessionStore(path, ttl_seconds)
+    raise ValueError(f"Unknown SESSION_BACKEND '{backend}', expected 'memory' or 'sqlite'")
@@ -0,0 +1,165 @@
+"""
+simulate_cli.py
+Headless batch runner: simulate every landscape file against a parameter grid
+and write one result per line.
+
+    python -m simulate_cli landscapes/ --target 85 80 --max-epochs 100 1000 -o results.jsonl
+
+Landscape files are JSON (a list of rows, or an object with "rows" and
+optional "P_baseline"/"P_target"/"max_epochs", as served by
+/get_simulation_data) or CSV with the nine row columns. Runs are spread across
+a process pool. Only NumPy is needed; Flask, matplotlib, pydantic and
+LangChain are never imported.
+"""
+
+import argparse
+import contextlib
+import csv
+import glob
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+from logging_config import configure_logging
+from simulation import LEARNING_RATE, run_simulation
+
+# Defaults used when neither the command line nor the landscape file sets them
+DEFAULT_P_BASELINE = 100.0
+DEFAULT_P_TARGET = 85.0
+DEFAULT_MAX_EPOCHS = 50
+
+
+def find_landscape_files(sources: List[str]) -> List[str]:
+    """Expand directories and glob patterns into a sorted list of .json/.csv files."""
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            matches = glob.glob(os.path.join(source, "**", "*.json"), recursive=True)
+            matches += glob.glob(os.path.join(source, "**", "*.csv"), recursive=True)
+        else:
+            matches = glob.glob(source, recursive=True)
+        if not matches:
+            raise FileNotFoundError(f"No landscape files match '{source}'")
+        paths.extend(matches)
+    return sorted(set(paths))
+
+
+def load_landscape(path: str) -> Dict:
+    """Read a landscape file into {"rows": [...], ...optional parameters}."""
+    if path.endswith(".csv"):
+        with open(path, newline="") as f:
+            rows = [[value if value != "" else None for value in row] for row in csv.reader(f) if row]
+        # Drop a header row if the delta column is not numeric
+        if rows:
+            try:
+                float(rows[0][3])
+            except (ValueError, TypeError, IndexError):
+                rows = rows[1:]
+        return {"rows": rows}
+
+    with open(path) as f:
+        data = json.load(f)
+    return data if isinstance(data, dict) else {"rows": data}
+
+
+def _run_task(task: Dict) -> Dict:
+    """Run one (landscape, parameters) combination; executed in a worker process."""
+    record = {key: task[key] for key in ("source", "P_baseline", "P_target", "max_epochs", "learning_rate")}
+    try:
+        result = run_simulation(
+            task["rows"], task["P_baseline"], task["P_target"], task["max_epochs"],
+            learning_rate=task["learning_rate"], stall_tolerance=task["stall_tolerance"],
+            record="summary"
+        )
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        return record
+
+    record.update({
+        "t_hit": result.t_hit,
+        "stalled_at": result.stalled_at,
+        "stall_reason": result.stall_reason,
+        "final_value": float(result.P_series[-1]),
+        "total_epochs": len(result.P_series)
+    })
+    if task["include_series"]:
+        record["P_series"] = result.P_series.tolist()
+    return record
+
+
+def build_tasks(paths: List[str], args: argparse.Namespace) -> Iterator[Dict]:
+    """Yield one task per landscape file and point of the parameter grid."""
+    for path in paths:
+        landscape = load_landscape(path)
+        baselines = args.baseline or [landscape.get("P_baseline", DEFAULT_P_BASELINE)]
+        targets = args.target or [landscape.get("P_target", DEFAULT_P_TARGET)]
+        epochs = args.max_epochs or [landscape.get("max_epochs", DEFAULT_MAX_EPOCHS)]
+
+        for P_baseline, P_target, max_epochs, learning_rate in itertools.product(
+                baselines, targets, epochs, args.learning_rate):
+            yield {
+                "source": path,
+                "rows": landscape["rows"],
+                "P_baseline": float(P_baseline),
+                "P_target": float(P_target),
+                "max_epochs": int(max_epochs),
+                "learning_rate": float(learning_rate),
+                "stall_tolerance": args.stall_tolerance,
+                "include_series": args.include_series
+            }
+
+
+def write_results(records: Iterator[Dict], output: str, output_format: str):
+    if output_format == "parquet":
+        # Optional dependency, only needed for Parquet output
+        import pandas as pd
+        pd.DataFrame(list(records)).to_parquet(output, index=False)
+        return
+
+    with contextlib.ExitStack() as stack:
+        f = sys.stdout if output == "-" else stack.enter_context(open(output, "w"))
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run evolutionary simulations over landscape files and a parameter grid.")
+    parser.add_argument("sources", nargs="+", help="Landscape files, directories or glob patterns (.json / .csv)")
+    parser.add_argument("--baseline", type=float, nargs="+", help="P_baseline values (default: from file, else 100)")
+    parser.add_argument("--target", type=float, nargs="+", help="P_target values (default: from file, else 85)")
+    parser.add_argument("--max-epochs", type=int, nargs="+", help="max_epochs values (default: from file, else 50)")
+    parser.add_argument("--learning-rate", type=float, nargs="+", default=[LEARNING_RATE], help="Learning rate values")
+    parser.add_argument("--stall-tolerance", type=float, help="Stop runs early once they stall (see StallDetector)")
+    parser.add_argument("--include-series", action="store_true", help="Include the full P_series in each record")
+    parser.add_argument("-o", "--output", default="-", help="Output path, '-' for stdout (default)")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], help="Output format (default: from extension, else jsonl)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=16, help="Tasks handed to a worker at a time")
+    parser.add_argument("--log-level", default="WARNING", help="Log level for simulation messages (default: WARNING)")
+    parser.add_argument("--trace", action="store_true", help="Log every epoch of every run (slow)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    configure_logging(args.log_level, args.trace)
+    output_format = args.format or ("parquet" if args.output.endswith(".parquet") else "jsonl")
+    if output_format == "parquet" and args.output == "-":
+        raise SystemExit("Parquet output needs a file path (-o results.parquet)")
+
+    tasks = build_tasks(find_landscape_files(args.sources), args)
+
+    if args.workers <= 1:
+        write_results(map(_run_task, tasks), args.output, output_format)
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            write_results(pool.map(_run_task, tasks, chunksize=args.chunksize), args.output, output_format)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
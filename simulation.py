@@ -1,24 +1,124 @@
 import numpy as np
 import json
-from typing import List, Optional, Tuple
-from pydantic import BaseModel, Field
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
+import base64
+import logging
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
 import uuid
 import os
+import threading
 
 # Constants
 EPSILON = 1e-3
+LEARNING_RATE = 0.3  # Higher learning rate for more dynamic behavior
+STALL_WINDOW = 10  # Consecutive quiet epochs before a run is flagged as stalled
+STALL_REASONS = {1: "fixed_point", 2: "shares_stalled", 3: "metric_stalled"}
+RECORD_MODES = ("full", "strided", "last", "summary")
 
-class SimulationResult(BaseModel):
-    P_series: List[float] = Field(description="Headline metric over time")
-    share: List[List[List[float]]] = Field(description="Strategy shares [actor][strategy][epoch]")
-    payoff: List[List[List[float]]] = Field(description="Payoffs [actor][strategy][epoch]")
-    t_hit: Optional[int] = Field(description="Epoch when target was hit, None if not reached")
-    
-    class Config:
-        arbitrary_types_allowed = True
+logger = logging.getLogger(__name__)
+# Per-epoch tracing; off unless enabled explicitly (see logging_config.py)
+trace_logger = logging.getLogger(__name__ + ".trace")
+
+# pyplot keeps global figure state, so concurrent renders must not interleave
+_PLOT_LOCK = threading.Lock()
+
+@dataclass
+class SimulationResult:
+    """
+    Result of a single run, backed by NumPy buffers.
+    
+    Histories stay as arrays (float64 or float32, see `run_simulation`'s `dtype`);
+    call `to_dict()` or `to_json()` only when lists or JSON are actually needed.
+    `epochs` maps each history column back to its epoch, since the recording
+    policy may keep only some epochs.
+    
+    A plain dataclass, so the simulation core needs nothing beyond NumPy.
+    """
+    P_series: np.ndarray  # Headline metric over time
+    share: np.ndarray  # Strategy shares [actor][strategy][recorded epoch]
+    payoff: np.ndarray  # Payoffs [actor][strategy][recorded epoch]
+    epochs: np.ndarray  # Epoch of each recorded history column
+    t_hit: Optional[int]  # Epoch when target was hit, None if not reached
+    stalled_at: Optional[int] = None  # Epoch when the run stalled short of the target (needs incentives)
+    stall_reason: Optional[str] = None  # Why the run stalled: fixed_point, shares_stalled or metric_stalled
+    
+    def actor_shares(self, g: int) -> np.ndarray:
+        """Zero-copy [strategy][epoch] view of one actor's shares."""
+        return self.share[g]
+    
+    def strategy_shares(self, k: int) -> np.ndarray:
+        """Zero-copy [actor][epoch] view of one strategy's shares."""
+        return self.share[:, k]
+    
+    def actor_payoffs(self, g: int) -> np.ndarray:
+        """Zero-copy [strategy][epoch] view of one actor's payoffs."""
+        return self.payoff[g]
+    
+    def strategy_payoffs(self, k: int) -> np.ndarray:
+        """Zero-copy [actor][epoch] view of one strategy's payoffs."""
+        return self.payoff[:, k]
+    
+    def to_dict(self) -> dict:
+        """Plain-Python form with nested lists, as the result used to be stored."""
+        return {
+            "P_series": self.P_series.tolist(),
+            "share": self.share.tolist(),
+            "payoff": self.payoff.tolist(),
+            "epochs": self.epochs.tolist(),
+            "t_hit": self.t_hit,
+            "stalled_at": self.stalled_at,
+            "stall_reason": self.stall_reason
+        }
+    
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+    
+    def to_compact(self, max_points: Optional[int] = None) -> dict:
+        """
+        Compact form for drawing charts in the browser.
+        
+        Every series is little-endian float32 encoded as base64, ready for a
+        JavaScript Float32Array; `share` and `payoff` are flattened in
+        [actor][strategy][column] order. With `max_points`, P_series and the
+        histories are each thinned to at most that many evenly spaced epochs
+        (always keeping the first and last).
+        """
+        metric_epochs = downsample_indices(len(self.P_series), max_points)
+        columns = downsample_indices(len(self.epochs), max_points)
+        G, K = self.share.shape[:2]
+        return {
+            "encoding": "base64-float32-le",
+            "actors": G,
+            "strategies": K,
+            "metric_epochs": encode_float32(metric_epochs),
+            "P_series": encode_float32(self.P_series[metric_epochs]),
+            "epochs": encode_float32(self.epochs[columns]),
+            "share": encode_float32(self.share[:, :, columns]),
+            "payoff": encode_float32(self.payoff[:, :, columns])
+        }
+
+def downsample_indices(n: int, max_points: Optional[int] = None) -> np.ndarray:
+    """Indices of at most `max_points` evenly spaced items out of `n`, including both ends."""
+    if max_points is None or n <= max_points:
+        return np.arange(n)
+    if max_points < 2:
+        raise ValueError("max_points must be at least 2")
+    return np.unique(np.linspace(0, n - 1, max_points).round().astype(np.intp))
+
+def encode_float32(values: np.ndarray) -> str:
+    """Base64 of the values as contiguous little-endian float32."""
+    return base64.b64encode(np.ascontiguousarray(values, dtype='<f4').tobytes()).decode('ascii')
+
+@dataclass(kw_only=True)
+class BatchSimulationResult:
+    P_series: Optional[np.ndarray] = None  # Headline metric [scenario][epoch], NaN once a scenario has stopped
+    final_P: np.ndarray  # Headline metric at each scenario's last epoch
+    t_hit: np.ndarray  # Epoch when each scenario hit its target, -1 if not reached
+    n_epochs: np.ndarray  # Number of epochs each scenario ran for
+    stalled_at: np.ndarray  # Epoch when each scenario stalled short of its target, -1 if it did not
+    final_share: np.ndarray  # Strategy shares at each scenario's last epoch [scenario][actor][strategy]
+    final_payoff: np.ndarray  # Payoffs at each scenario's last epoch [scenario][actor][strategy]
+    cumulative_share: Optional[np.ndarray] = None  # Shares summed over every epoch each scenario ran [scenario][actor][strategy]
 
 def parse_rows_to_arrays(rows: List[List]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, List[str], List[str]]:
     """Convert list of rows to structured arrays."""
@@ -29,7 +129,7 @@ def parse_rows_to_arrays(rows: List[List]) -> Tuple[np.ndarray, np.ndarray, np.n
     
     for row in rows:
         if len(row) < 9:
-            print(f"Warning: Row has insufficient data: {row}")
+            logger.warning("Row has insufficient data: %s", row)
             continue
             
         sector, strategy_id, commitment_level, delta, private_cost, weight, payoff_epoch_0, behavior_share_epoch_0, description = row
@@ -47,7 +147,7 @@ def parse_rows_to_arrays(rows: List[List]) -> Tuple[np.ndarray, np.ndarray, np.n
             payoff_base_val = float(payoff_epoch_0) if payoff_epoch_0 not in [None, 'N/A', 'null'] else 0.1
             behavior_share_val = float(behavior_share_epoch_0) if behavior_share_epoch_0 not in [None, 'N/A', 'null'] else 1/3
         except (ValueError, TypeError) as e:
-            print(f"Warning: Could not convert values in row {row}: {e}")
+            logger.warning("Could not convert values in row %s: %s", row, e)
             continue
         
         actors[sector].append({
@@ -101,8 +201,183 @@ def parse_rows_to_arrays(rows: List[List]) -> Tuple[np.ndarray, np.ndarray, np.n
     
     return delta_raw, private_cost, weight, payoff_base, initial_shares, sector_names, strategy_ids
 
-def run_simulation(rows: List[List], P_baseline: float, P_target: float, max_epochs: int, scale: Optional[float] = None) -> SimulationResult:
-    """Run evolutionary game theory simulation."""
+class HistoryRecorder:
+    """
+    Keep share and payoff history according to a recording policy.
+    
+    - "full":    every epoch (O(G·K·T) memory)
+    - "strided": every `every`-th epoch, plus the final one
+    - "last":    the last `last` epochs, in a ring buffer
+    - "summary": the final epoch only (O(G·K) memory)
+    """
+    
+    def __init__(self, mode: str, G: int, K: int, max_epochs: int, every: int = 1, last: int = 100,
+                 dtype=np.float64):
+        if mode not in RECORD_MODES:
+            raise ValueError(f"Unknown recording mode '{mode}', expected one of {RECORD_MODES}")
+        if every < 1 or last < 1:
+            raise ValueError("record_every and record_last must be at least 1")
+        
+        capacity = {
+            "full": max_epochs,
+            "strided": -(-max_epochs // every),
+            "last": min(last, max_epochs),
+            "summary": 0
+        }[mode]
+        
+        self.mode = mode
+        self.every = every
+        self.count = 0
+        self.epochs = np.zeros(capacity, dtype=int)
+        self.share = np.zeros((capacity, G, K), dtype=dtype)
+        self.payoff = np.zeros((capacity, G, K), dtype=dtype)
+        self.latest = None
+    
+    def record(self, t: int, share: np.ndarray, payoff: np.ndarray):
+        # Shares and payoffs are fresh arrays each epoch, so holding references is safe
+        self.latest = (t, share, payoff)
+        
+        if self.mode == "full" or (self.mode == "strided" and t % self.every == 0):
+            slot = self.count
+        elif self.mode == "last":
+            slot = self.count % len(self.epochs)
+        else:
+            return
+        
+        self.epochs[slot] = t
+        self.share[slot] = share
+        self.payoff[slot] = payoff
+        self.count += 1
+    
+    def finish(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (epochs, share, payoff) with history ordered by epoch, epoch-major."""
+        capacity = len(self.epochs)
+        if self.mode == "last" and self.count > capacity:
+            order = np.roll(np.arange(capacity), -(self.count % capacity))
+            epochs, share, payoff = self.epochs[order], self.share[order], self.payoff[order]
+        else:
+            # Copy only if trimming frees memory
+            n = min(self.count, capacity)
+            epochs, share, payoff = self.epochs[:n], self.share[:n], self.payoff[:n]
+            if n < capacity:
+                epochs, share, payoff = epochs.copy(), share.copy(), payoff.copy()
+        
+        # Always include the final state
+        if self.latest is not None and (len(epochs) == 0 or epochs[-1] != self.latest[0]):
+            t, last_share, last_payoff = self.latest
+            epochs = np.append(epochs, t)
+            share = np.concatenate([share, last_share[np.newaxis].astype(share.dtype)])
+            payoff = np.concatenate([payoff, last_payoff[np.newaxis].astype(payoff.dtype)])
+        
+        return epochs, share, payoff
+
+class StallDetector:
+    """
+    Flag runs that have stopped moving (Stage 5 of math_algo.md: "needs incentives").
+    
+    A run stalls when the largest share change, or the change in P_t, stays below
+    `tolerance` for `window` consecutive epochs, or at once if the shares reach an
+    exact fixed point. Counters are arrays of `shape`, so one detector can track a
+    single run or every scenario in a batch.
+    """
+    
+    def __init__(self, tolerance: float, window: int = STALL_WINDOW, shape: Tuple[int, ...] = ()):
+        self.tolerance = tolerance
+        self.window = window
+        self.quiet_shares = np.zeros(shape, dtype=int)
+        self.quiet_metric = np.zeros(shape, dtype=int)
+    
+    def update(self, share_change, metric_change) -> np.ndarray:
+        """Record one epoch of changes; return stall reason codes (0 = still moving)."""
+        self.quiet_shares = np.where(share_change < self.tolerance, self.quiet_shares + 1, 0)
+        self.quiet_metric = np.where(metric_change < self.tolerance, self.quiet_metric + 1, 0)
+        return np.select(
+            [share_change == 0, self.quiet_shares >= self.window, self.quiet_metric >= self.window],
+            [1, 2, 3],
+            default=0
+        )
+    
+    def keep(self, mask: np.ndarray):
+        """Drop counters for scenarios that have left the batch."""
+        self.quiet_shares = self.quiet_shares[mask]
+        self.quiet_metric = self.quiet_metric[mask]
+
+def compute_progress(P_t, P_baseline, P_target):
+    """Fraction of the baseline-to-target movement achieved, clipped to [0, 1]."""
+    progress_needed = np.abs(P_target - P_baseline)
+    moved = np.where(P_target < P_baseline, P_baseline - P_t, P_t - P_baseline)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        progress_made = np.where(progress_needed > 0, np.maximum(0, moved / progress_needed), 1.0)
+    return np.minimum(progress_made, 1.0)
+
+def compute_dynamic_payoffs(payoff_base: np.ndarray, delta_raw: np.ndarray, share: np.ndarray,
+                            progress_made, target_direction) -> np.ndarray:
+    """
+    Dynamic payoffs for every (actor, strategy) cell in one pass.
+    
+    Arrays are (..., G, K); `progress_made` and `target_direction` are scalars or
+    (...)-shaped, so the same kernel serves a single run or a stack of scenarios.
+    """
+    progress_made = np.asarray(progress_made)[..., np.newaxis, np.newaxis]
+    target_direction = np.asarray(target_direction)[..., np.newaxis, np.newaxis]
+    
+    # 1. System progress bonus (rewards collective progress)
+    progress_bonus = progress_made * 0.5
+    
+    # 2. Strategy effectiveness bonus (rewards strategies that help reach target)
+    helps_target = np.where(target_direction, delta_raw < 0, delta_raw > 0)
+    strategy_effectiveness = np.where(helps_target, np.abs(delta_raw) * share * 2.0, 0.0)
+    
+    # 3. Coordination bonus (slight bonus for strategies being used by others)
+    coordination_bonus = np.mean(share, axis=-2, keepdims=True) * 0.1
+    
+    payoff = payoff_base + progress_bonus + strategy_effectiveness + coordination_bonus
+    
+    # Ensure minimum positive payoff for stability
+    return np.maximum(payoff, EPSILON)
+
+def replicator_update(share: np.ndarray, payoff: np.ndarray, learning_rate) -> np.ndarray:
+    """Advance (..., G, K) shares by one epoch of amplified replicator dynamics."""
+    K = share.shape[-1]
+    learning_rate = np.asarray(learning_rate)[..., np.newaxis, np.newaxis]
+    
+    # Average payoff per actor
+    avg_payoff = np.sum(share * payoff, axis=-1, keepdims=True)
+    
+    # Amplify fitness differences for more dynamic behavior, keeping a minimum share
+    amplified_diff = (payoff - avg_payoff) * 1.5
+    grown = np.maximum(share + learning_rate * share * amplified_diff, EPSILON * 10)
+    new_share = np.where(avg_payoff > EPSILON, grown, share)
+    
+    # Renormalize to ensure shares sum to 1
+    row_sum = np.sum(new_share, axis=-1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(row_sum > EPSILON, new_share / row_sum, 1/K)
+
+def run_simulation(rows: List[List], P_baseline: float, P_target: float, max_epochs: int, scale: Optional[float] = None,
+                   learning_rate: float = LEARNING_RATE, incentive: Optional[np.ndarray] = None,
+                   stall_tolerance: Optional[float] = None, stall_window: int = STALL_WINDOW,
+                   dtype=np.float64, record: str = "full", record_every: int = 10,
+                   record_last: int = 100,
+                   progress_callback: Optional[Callable[[int, float, float], None]] = None) -> SimulationResult:
+    """
+    Run evolutionary game theory simulation.
+    
+    `incentive` is an optional (G, K) π-matrix of subsidies (positive) or
+    penalties (negative) taken off each strategy's private cost, which lifts
+    its base payoff by the same amount.
+    
+    With `stall_tolerance` set, the run also stops early once it stalls (see
+    StallDetector), reporting `stalled_at` and `stall_reason`, so a large
+    `max_epochs` only costs as many epochs as the dynamics actually need.
+    
+    Share and payoff histories are stored as `dtype` (np.float32 halves their
+    memory); the dynamics themselves always run in float64. `record` picks how
+    much history to keep (see HistoryRecorder); P_series is always complete.
+    
+    `progress_callback(t, P_t, progress_made)` is called once per epoch, where
+    `progress_made` is the fraction of the required movement achieved (0..1).
+    """
     
     if not rows:
         raise ValueError("No data provided for simulation")
@@ -112,10 +387,11 @@ def run_simulation(rows: List[List], P_baseline: float, P_target: float, max_epo
     
     G, K = delta_raw.shape
     
-    # DEBUG: Print simulation setup
-    print(f"DEBUG SIMULATION: Baseline={P_baseline:.3f}, Target={P_target:.3f}")
-    print(f"DEBUG SIMULATION: {G} actors, {K} strategies per actor")
-    print(f"DEBUG SIMULATION: Target direction={'DOWN' if P_target < P_baseline else 'UP'}")
+    if incentive is not None:
+        payoff_base = payoff_base + np.asarray(incentive, dtype=float).reshape(G, K)
+    
+    logger.debug("Simulation setup: baseline=%.3f, target=%.3f, %d actors, %d strategies per actor, direction=%s",
+                 P_baseline, P_target, G, K, "DOWN" if P_target < P_baseline else "UP")
     
     # Determine scale for normalization
     if scale is None:
@@ -124,82 +400,43 @@ def run_simulation(rows: List[List], P_baseline: float, P_target: float, max_epo
         else:
             scale = abs(P_baseline) if P_baseline != 0 else 1.0
     
-    # Initialize storage arrays
+    # Initialize storage
     P_series = []
-    share_history = np.zeros((G, K, max_epochs))
-    payoff_history = np.zeros((G, K, max_epochs))
+    recorder = HistoryRecorder(record, G, K, max_epochs, record_every, record_last, dtype)
     
     # Set initial shares
     share = initial_shares.copy()
     t_hit = None
+    stalled_at = None
+    stall_reason = None
+    stall_detector = StallDetector(stall_tolerance, stall_window) if stall_tolerance is not None else None
     
     # Determine if we're moving towards target (up or down)
     target_direction = P_target < P_baseline
-    progress_needed = abs(P_target - P_baseline)
     
-    # Higher learning rate for more dynamic behavior
-    learning_rate = 0.3
-    
-    # Initialize progress_made to avoid UnboundLocalError
-    progress_made = 0.0
+    # Checked once, so the loop does no logging work unless tracing is on
+    trace = trace_logger.isEnabledFor(logging.DEBUG)
     
     for t in range(max_epochs):
         # Calculate current headline metric
         P_t = P_baseline + np.sum(delta_raw * share)
         P_series.append(float(P_t))
         
-        # Better progress calculation
-        if progress_needed > 0:
-            if target_direction:  # Moving down (P_target < P_baseline)
-                progress_made = max(0, (P_baseline - P_t) / progress_needed)
-            else:  # Moving up (P_target > P_baseline)
-                progress_made = max(0, (P_t - P_baseline) / progress_needed)
-        else:
-            progress_made = 1.0
-        
-        # Cap progress at 1.0
-        progress_made = min(progress_made, 1.0)
+        # Fraction of the required movement achieved so far, capped at 1.0
+        progress_made = compute_progress(P_t, P_baseline, P_target)
         
-        # DEBUG: Print every 10 epochs
-        if t % 10 == 0:
-            print(f"DEBUG SIMULATION: Epoch {t}, P_t={P_t:.6f}, Progress={(progress_made*100):.1f}%")
+        if progress_callback is not None:
+            progress_callback(t, float(P_t), float(progress_made))
         
         # Calculate dynamic payoffs with enhanced bonuses
-        payoff = np.zeros((G, K))
+        payoff = compute_dynamic_payoffs(payoff_base, delta_raw, share, progress_made, target_direction)
         
-        for g in range(G):
-            for k in range(K):
-                # Start with the pre-computed base payoff from infer_payoffs
-                base_payoff = payoff_base[g, k]
-                
-                # Dynamic payoff components
-                # 1. System progress bonus (rewards collective progress)
-                progress_bonus = progress_made * 0.5
-                
-                # 2. Strategy effectiveness bonus (rewards strategies that help reach target)
-                strategy_effectiveness = 0.0
-                if target_direction and delta_raw[g, k] < 0:  # Strategy helps move toward lower target
-                    strategy_effectiveness = abs(delta_raw[g, k]) * share[g, k] * 2.0
-                elif not target_direction and delta_raw[g, k] > 0:  # Strategy helps move toward higher target
-                    strategy_effectiveness = delta_raw[g, k] * share[g, k] * 2.0
-                
-                # 3. Coordination bonus (slight bonus for strategies being used by others)
-                coordination_bonus = np.mean(share[:, k]) * 0.1
-                
-                # Final payoff calculation
-                payoff[g, k] = base_payoff + progress_bonus + strategy_effectiveness + coordination_bonus
-                
-                # Ensure minimum positive payoff for stability
-                payoff[g, k] = max(payoff[g, k], EPSILON)
-        
-        # Additional debug info after payoff calculation
-        if t % 10 == 0:
-            print(f"  Sample payoffs: {payoff[0, :].round(6)}")
-            print(f"  Sample shares: {share[0, :].round(3)}")
+        if trace:
+            trace_logger.debug("Epoch %d: P_t=%.6f, progress=%.1f%%, sample payoffs=%s, sample shares=%s",
+                               t, P_t, progress_made * 100, payoff[0, :].round(6), share[0, :].round(3))
         
         # Store current state
-        share_history[:, :, t] = share
-        payoff_history[:, :, t] = payoff
+        recorder.record(t, share, payoff)
         
         # Check stopping condition
         if target_direction and P_t <= P_target:
@@ -211,58 +448,183 @@ def run_simulation(rows: List[List], P_baseline: float, P_target: float, max_epo
         
         # Replicator dynamics update with stronger response
         if t < max_epochs - 1:
-            new_share = share.copy()
+            new_share = replicator_update(share, payoff, learning_rate)
             
-            for g in range(G):
-                # Calculate average payoff for this actor
-                avg_payoff_g = np.sum(share[g, :] * payoff[g, :])
-                
-                if avg_payoff_g > EPSILON:
-                    # Enhanced replicator dynamics with stronger fitness differences
-                    for k in range(K):
-                        fitness_diff = payoff[g, k] - avg_payoff_g
-                        # Amplify fitness differences for more dynamic behavior
-                        amplified_diff = fitness_diff * 1.5
-                        new_share[g, k] = share[g, k] + learning_rate * share[g, k] * amplified_diff
-                        
-                        # Ensure non-negative with higher minimum
-                        new_share[g, k] = max(new_share[g, k], EPSILON * 10)
-                
-                # Renormalize to ensure shares sum to 1
-                row_sum = np.sum(new_share[g, :])
-                if row_sum > EPSILON:
-                    new_share[g, :] /= row_sum
-                else:
-                    new_share[g, :] = 1/K
+            if stall_detector is not None:
+                metric_change = abs(P_t - P_series[-2]) if t > 0 else np.inf
+                reason = int(stall_detector.update(np.max(np.abs(new_share - share)), metric_change))
+                if reason:
+                    stalled_at = t
+                    stall_reason = STALL_REASONS[reason]
+                    logger.debug("Stalled at epoch %d (%s), P_t=%.6f", t, stall_reason, P_t)
+                    break
             
             share = new_share
     
-    # Trim arrays to actual simulation length
-    actual_length = len(P_series)
-    share_trimmed = share_history[:, :, :actual_length]
-    payoff_trimmed = payoff_history[:, :, :actual_length]
+    # Expose the recorded history as [actor][strategy][epoch] views
+    epochs, share_history, payoff_history = recorder.finish()
     
     return SimulationResult(
-        P_series=P_series,
-        share=share_trimmed.tolist(),
-        payoff=payoff_trimmed.tolist(),
-        t_hit=t_hit
+        P_series=np.asarray(P_series),
+        share=share_history.transpose(1, 2, 0),
+        payoff=payoff_history.transpose(1, 2, 0),
+        epochs=epochs,
+        t_hit=t_hit,
+        stalled_at=stalled_at,
+        stall_reason=stall_reason
     )
 
-def generate_plots(result: SimulationResult, P_baseline: float, P_target: float, sector_names: List[str]) -> Tuple[str, str, str]:
-    """Generate matplotlib plots and return filenames."""
+def simulate_batch_arrays(delta_raw: np.ndarray, payoff_base: np.ndarray, initial_shares: np.ndarray,
+                          P_baseline, P_target, max_epochs: int, learning_rate=LEARNING_RATE,
+                          record_series: bool = True, stall_tolerance: Optional[float] = None,
+                          stall_window: int = STALL_WINDOW, record_cumulative_share: bool = False) -> BatchSimulationResult:
+    """
+    Advance a stack of S scenarios together as one (S, G, K) array.
+    
+    Landscape arrays are (G, K) when shared by every scenario or (S, G, K) when
+    each scenario has its own; P_baseline, P_target and learning_rate are scalars
+    or length-S. Scenarios are dropped from the working set as soon as they hit
+    their target, so finished scenarios cost nothing in later epochs. With
+    `record_series=False` no per-epoch history is kept, only the final state.
+    With `stall_tolerance` set, stalled scenarios leave the working set too.
+    With `record_cumulative_share`, Σ_t share is kept per scenario, so costs
+    paid on every epoch's shares (such as incentive spend, see
+    OptimaStore.add_batch) can be computed without the history.
+    """
+    delta_raw = np.asarray(delta_raw, dtype=float)
+    payoff_base = np.asarray(payoff_base, dtype=float)
+    initial_shares = np.asarray(initial_shares, dtype=float)
+    G, K = delta_raw.shape[-2:]
+    
+    batch_shape = np.broadcast_shapes(np.shape(P_baseline), np.shape(P_target), np.shape(learning_rate),
+                                      delta_raw.shape[:-2], payoff_base.shape[:-2], initial_shares.shape[:-2])
+    if len(batch_shape) > 1:
+        raise ValueError(f"Scenario parameters must be scalars or 1-D, got batch shape {batch_shape}")
+    S = batch_shape[0] if batch_shape else 1
+    
+    def stack(values, trailing=()):
+        return np.broadcast_to(np.asarray(values, dtype=float), (S,) + trailing)
+    
+    # Working set: only the scenarios still running, with `index` mapping back to the stack
+    index = np.arange(S)
+    P_base = stack(P_baseline)
+    P_goal = stack(P_target)
+    rate = stack(learning_rate)
+    delta = stack(delta_raw, (G, K))
+    base = stack(payoff_base, (G, K))
+    share = stack(initial_shares, (G, K)).copy()
+    target_direction = P_goal < P_base
+    
+    P_series = np.full((S, max_epochs), np.nan) if record_series else None
+    final_P = np.full(S, np.nan)
+    t_hit = np.full(S, -1, dtype=int)
+    n_epochs = np.zeros(S, dtype=int)
+    stalled_at = np.full(S, -1, dtype=int)
+    stall_detector = StallDetector(stall_tolerance, stall_window, (S,)) if stall_tolerance is not None else None
+    P_previous = np.full(S, np.inf)
+    stalled = np.zeros(S, dtype=bool)
+    final_share = np.zeros((S, G, K))
+    final_payoff = np.zeros((S, G, K))
+    cumulative_share = np.zeros((S, G, K)) if record_cumulative_share else None
     
-    plot_dir = "static/plots"
-    os.makedirs(plot_dir, exist_ok=True)
+    for t in range(max_epochs):
+        if record_cumulative_share:
+            cumulative_share[index] += share
+        P_t = P_base + np.sum(delta * share, axis=(-2, -1))
+        progress_made = compute_progress(P_t, P_base, P_goal)
+        payoff = compute_dynamic_payoffs(base, delta, share, progress_made, target_direction)
+        
+        if record_series:
+            P_series[index, t] = P_t
+        
+        hit = np.where(target_direction, P_t <= P_goal, P_t >= P_goal)
+        last_epoch = t == max_epochs - 1
+        if not last_epoch:
+            new_share = replicator_update(share, payoff, rate)
+            if stall_detector is not None:
+                share_change = np.max(np.abs(new_share - share), axis=(-2, -1))
+                stalled = (stall_detector.update(share_change, np.abs(P_t - P_previous)) > 0) & ~hit
+        
+        if last_epoch or hit.any() or stalled.any():
+            # Record the last state of every scenario that stops here
+            stopping = np.ones_like(hit) if last_epoch else hit | stalled
+            t_hit[index[hit]] = t
+            stalled_at[index[stalled]] = t
+            n_epochs[index[stopping]] = t + 1
+            final_P[index[stopping]] = P_t[stopping]
+            final_share[index[stopping]] = share[stopping]
+            final_payoff[index[stopping]] = payoff[stopping]
+            
+            keep = ~stopping
+            if not keep.any():
+                break
+            index, P_base, P_goal, rate = index[keep], P_base[keep], P_goal[keep], rate[keep]
+            delta, base, new_share, P_t = delta[keep], base[keep], new_share[keep], P_t[keep]
+            target_direction, stalled = target_direction[keep], stalled[keep]
+            if stall_detector is not None:
+                stall_detector.keep(keep)
+        
+        share = new_share
+        P_previous = P_t
+    
+    return BatchSimulationResult(
+        P_series=P_series[:, :n_epochs.max(initial=0)] if record_series else None,
+        final_P=final_P,
+        t_hit=t_hit,
+        n_epochs=n_epochs,
+        stalled_at=stalled_at,
+        final_share=final_share,
+        final_payoff=final_payoff,
+        cumulative_share=cumulative_share
+    )
+
+def run_simulation_batch(rows: List[List], P_baseline, P_target, max_epochs: int,
+                         learning_rate=LEARNING_RATE, initial_shares: Optional[np.ndarray] = None,
+                         record_cumulative_share: bool = False) -> BatchSimulationResult:
+    """
+    Run many scenarios on one landscape in a single vectorised pass.
+    
+    Parameters
+    ----------
+    rows : List[List]
+        Landscape rows, parsed once and shared by every scenario.
+    P_baseline, P_target, learning_rate : float or array of shape (S,)
+        Per-scenario parameters; scalars are shared by every scenario.
+    max_epochs : int
+        Epoch limit applied to every scenario.
+    initial_shares : np.ndarray, optional
+        (G, K) or (S, G, K) starting shares; defaults to the shares in `rows`.
+    record_cumulative_share : bool
+        Keep Σ_t share per scenario, as OptimaStore.add_batch needs for incentive spend.
+    
+    Returns
+    -------
+    BatchSimulationResult
+        Stacked per-scenario arrays instead of S separate SimulationResult objects.
+    """
+    if not rows:
+        raise ValueError("No data provided for simulation")
     
-    # Convert back to numpy for plotting
-    share_array = np.array(result.share)
-    payoff_array = np.array(result.payoff)
-    epochs = list(range(len(result.P_series)))
+    delta_raw, _, _, payoff_base, row_shares, _, _ = parse_rows_to_arrays(rows)
+    if initial_shares is None:
+        initial_shares = row_shares
+    
+    return simulate_batch_arrays(delta_raw, payoff_base, initial_shares, P_baseline, P_target, max_epochs, learning_rate,
+                                 record_cumulative_share=record_cumulative_share)
+
+def _pyplot():
+    """Import pyplot on first use so the simulation core stays usable without matplotlib."""
+    import matplotlib
+    matplotlib.use('Agg')  # Use non-interactive backend
+    import matplotlib.pyplot as plt
+    return plt
+
+def render_metric_plot(path: str, P_series: np.ndarray, P_baseline: float, P_target: float):
+    """Line plot of the headline metric against the target and baseline."""
+    plt = _pyplot()
     
-    # Plot 1: Line plot of P_series
     fig1, ax1 = plt.subplots(figsize=(10, 6))
-    ax1.plot(epochs, result.P_series, linewidth=2, label='Headline Metric')
+    ax1.plot(np.arange(len(P_series)), P_series, linewidth=2, label='Headline Metric')
     ax1.axhline(y=P_target, color='red', linestyle='--', label=f'Target: {P_target:.3f}')
     ax1.axhline(y=P_baseline, color='gray', linestyle=':', alpha=0.7, label=f'Baseline: {P_baseline:.3f}')
     ax1.set_xlabel('Epoch')
@@ -271,13 +633,15 @@ def generate_plots(result: SimulationResult, P_baseline: float, P_target: float,
     ax1.legend()
     ax1.grid(True, alpha=0.3)
     
-    filename1 = f"{uuid.uuid4().hex}_metric.png"
-    fig1.savefig(os.path.join(plot_dir, filename1), dpi=150, bbox_inches='tight')
+    fig1.savefig(path, dpi=150, bbox_inches='tight')
     plt.close(fig1)
+
+def render_shares_plot(path: str, epochs: np.ndarray, share: np.ndarray, sector_names: List[str]):
+    """Stacked area charts of strategy shares, one panel per actor; `share` is (G, K, T)."""
+    plt = _pyplot()
     
-    # Plot 2: Stacked area charts of shares
     G = len(sector_names)
-    K = share_array.shape[1]  # Number of strategies
+    K = share.shape[1]  # Number of strategies
     
     fig2, axes2 = plt.subplots(G, 1, figsize=(12, 2*G), sharex=True)
     if G == 1:
@@ -285,7 +649,7 @@ def generate_plots(result: SimulationResult, P_baseline: float, P_target: float,
     
     for g in range(G):
         ax = axes2[g]
-        shares_g = share_array[g, :, :]  # K x T
+        shares_g = share[g, :, :]  # K x T
         
         # Create stacked area plot
         ax.stackplot(epochs, *shares_g, alpha=0.7, labels=[f'Strategy {k+1}' for k in range(K)])
@@ -299,20 +663,26 @@ def generate_plots(result: SimulationResult, P_baseline: float, P_target: float,
     if G > 0:
         axes2[-1].set_xlabel('Epoch')
     
-    filename2 = f"{uuid.uuid4().hex}_shares.png"
-    fig2.savefig(os.path.join(plot_dir, filename2), dpi=150, bbox_inches='tight')
+    fig2.savefig(path, dpi=150, bbox_inches='tight')
     plt.close(fig2)
+
+def render_payoffs_plot(path: str, epochs: np.ndarray, payoff: np.ndarray, sector_names: List[str]):
+    """Payoff heatmaps, one per actor; `payoff` is (G, K, T)."""
+    plt = _pyplot()
+    
+    G = len(sector_names)
+    K = payoff.shape[1]  # Number of strategies
     
-    # Plot 3: Heatmap of payoffs
     fig3, axes3 = plt.subplots(1, G, figsize=(4*G, 6))
     if G == 1:
         axes3 = [axes3]
     
     for g in range(G):
         ax = axes3[g]
-        payoffs_g = payoff_array[g, :, :]  # K x T
+        payoffs_g = payoff[g, :, :]  # K x T
         
-        im = ax.imshow(payoffs_g, aspect='auto', origin='lower', cmap='viridis')
+        im = ax.imshow(payoffs_g, aspect='auto', origin='lower', cmap='viridis',
+                       extent=(epochs[0] - 0.5, epochs[-1] + 0.5, -0.5, K - 0.5))
         ax.set_title(f'{sector_names[g][:15]}...' if len(sector_names[g]) > 15 else sector_names[g])
         ax.set_xlabel('Epoch')
         if g == 0:
@@ -323,11 +693,44 @@ def generate_plots(result: SimulationResult, P_baseline: float, P_target: float,
         # Add colorbar
         plt.colorbar(im, ax=ax, label='Payoff')
     
-    filename3 = f"{uuid.uuid4().hex}_payoffs.png"
-    fig3.savefig(os.path.join(plot_dir, filename3), dpi=150, bbox_inches='tight')
+    fig3.savefig(path, dpi=150, bbox_inches='tight')
     plt.close(fig3)
+
+# Plot kinds, in the order generate_plots returns them
+PLOT_RENDERERS = {
+    "metric": render_metric_plot,
+    "shares": render_shares_plot,
+    "payoffs": render_payoffs_plot
+}
+
+def plot_arguments(kind: str, result: SimulationResult, P_baseline: float, P_target: float,
+                   sector_names: List[str]) -> tuple:
+    """Arguments (after the output path) for PLOT_RENDERERS[kind]; only the arrays that plot needs."""
+    if kind == "metric":
+        return (np.asarray(result.P_series), P_baseline, P_target)
+    if kind == "shares":
+        return (np.asarray(result.epochs), np.asarray(result.share), sector_names)
+    if kind == "payoffs":
+        return (np.asarray(result.epochs), np.asarray(result.payoff), sector_names)
+    raise ValueError(f"Unknown plot kind '{kind}', expected one of {list(PLOT_RENDERERS)}")
+
+def generate_plots(result: SimulationResult, P_baseline: float, P_target: float, sector_names: List[str]) -> Tuple[str, str, str]:
+    """
+    Render all plots in-process and return their filenames in static/plots.
+    
+    Safe to call from worker threads. The web app renders through
+    plot_renderer.PlotRenderer instead, off the request path.
+    """
+    plot_dir = "static/plots"
+    os.makedirs(plot_dir, exist_ok=True)
     
-    return filename1, filename2, filename3
+    filenames = []
+    with _PLOT_LOCK:
+        for kind, render in PLOT_RENDERERS.items():
+            filename = f"{uuid.uuid4().hex}_{kind}.png"
+            render(os.path.join(plot_dir, filename), *plot_arguments(kind, result, P_baseline, P_target, sector_names))
+            filenames.append(filename)
+    return tuple(filenames)
 
 def generate_sample_json(rows_path: str, out_path: str):
     """Testing helper function."""
@@ -343,4 +746,4 @@ def generate_sample_json(rows_path: str, out_path: str):
     )
     
     with open(out_path, 'w') as f:
-        json.dump(result.model_dump(), f, indent=2)
\ No newline at end of file
+        json.dump(result.to_dict(), f, indent=2)
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+simulation_jobs.py
+In-process job queue for long-running simulations.
+
+A job runs on a small thread pool and reports progress through a callback.
+Progress is coalesced: each job only keeps its latest snapshot, and listeners
+are woken at most every `notify_interval` seconds, so a fast simulation does
+not flood a slow Server-Sent-Events client. Finished jobs are kept, up to
+`max_finished`, so their results can be fetched by id.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, Optional
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETE = "complete"
+ERROR = "error"
+FINISHED_STATES = (COMPLETE, ERROR)
+
+
+class Job:
+    """State of one submitted job; only read or written under the queue's lock."""
+
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.status = QUEUED
+        self.progress: Dict = {}
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.version = 0  # bumped on every change listeners should see
+        self.notified_at = 0.0
+
+    def snapshot(self) -> Dict:
+        data = {"job_id": self.id, "status": self.status, "progress": dict(self.progress)}
+        if self.status == COMPLETE:
+            data["result"] = self.result
+        elif self.status == ERROR:
+            data["error"] = self.error
+        return data
+
+
+class JobQueue:
+    """
+    Run callables on a thread pool and track their progress and results.
+
+    Parameters
+    ----------
+    max_workers : int
+        Jobs executed at the same time; later jobs wait in the queue.
+    max_finished : int
+        Finished jobs retained for result lookups; the oldest are dropped first.
+    notify_interval : float
+        Minimum seconds between progress wake-ups for listeners.
+    """
+
+    def __init__(self, max_workers: int = 2, max_finished: int = 100, notify_interval: float = 0.1):
+        self.max_finished = max_finished
+        self.notify_interval = notify_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="simulation-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._changed = threading.Condition()
+
+    def submit(self, fn: Callable[..., Dict], *args, **kwargs) -> str:
+        """
+        Queue `fn(*args, progress_callback=..., **kwargs)` and return its job id.
+
+        `fn` must return a JSON-serialisable dict. It receives a
+        `progress_callback(**fields)` that replaces the job's progress snapshot.
+        """
+        job = Job(uuid.uuid4().hex)
+        with self._changed:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job: Job, fn: Callable[..., Dict], args: tuple, kwargs: dict):
+        self._update(job, status=RUNNING)
+
+        def progress_callback(**fields):
+            self._update(job, progress=fields, throttle=True)
+
+        try:
+            result = fn(*args, progress_callback=progress_callback, **kwargs)
+        except Exception as e:
+            self._update(job, status=ERROR, error=str(e))
+        else:
+            self._update(job, status=COMPLETE, result=result)
+
+    def _update(self, job: Job, status: Optional[str] = None, progress: Optional[Dict] = None,
+                result: Optional[Dict] = None, error: Optional[str] = None, throttle: bool = False):
+        with self._changed:
+            if progress is not None:
+                job.progress = progress
+            if status is not None:
+                job.status = status
+                job.result = result
+                job.error = error
+            if status in FINISHED_STATES:
+                job.finished_at = time.time()
+                self._evict()
+
+            job.version += 1
+            now = time.monotonic()
+            if not throttle or now - job.notified_at >= self.notify_interval:
+                job.notified_at = now
+                self._changed.notify_all()
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Snapshot of a job, or None if the id is unknown or has been evicted."""
+        with self._changed:
+            job = self._jobs.get(job_id)
+            return job.snapshot() if job is not None else None
+
+    def events(self, job_id: str, keepalive: float = 15.0) -> Iterator[Optional[Dict]]:
+        """
+        Yield job snapshots as the job changes, ending after the final one.
+
+        Each snapshot is the latest state at wake-up time, so intermediate
+        progress may be skipped. Yields None after `keepalive` seconds without
+        a change so callers can keep idle connections open.
+        """
+        seen = -1
+        while True:
+            with self._changed:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return
+                if job.version == seen:
+                    self._changed.wait_for(lambda: job.version != seen, timeout=keepalive)
+                if job.version == seen:
+                    snapshot = None
+                else:
+                    seen = job.version
+                    snapshot = job.snapshot()
+
+            yield snapshot
+            if snapshot is not None and snapshot["status"] in FINISHED_STATES:
+                return
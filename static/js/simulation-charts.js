@@ -0,0 +1,196 @@
+// Draws simulation charts in the browser from the compact series returned
+// by /simulate with render: 'client' (base64 little-endian float32 arrays).
+const SimulationCharts = {
+  colors: ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b'],
+  margin: { top: 20, right: 20, bottom: 35, left: 60 },
+
+  // Min and max without spreading, which overflows the stack for long arrays
+  extent: function (values) {
+    let min = Infinity
+    let max = -Infinity
+    for (const v of values) {
+      if (v < min) min = v
+      if (v > max) max = v
+    }
+    return [min, max]
+  },
+
+  decode: function (base64) {
+    const bytes = Uint8Array.from(atob(base64), (c) => c.charCodeAt(0))
+    return new Float32Array(bytes.buffer)
+  },
+
+  // Size a canvas for the device pixel ratio and return its 2D context
+  setup: function (canvas, height) {
+    const ratio = window.devicePixelRatio || 1
+    const width = canvas.parentElement.clientWidth || 800
+    canvas.style.width = width + 'px'
+    canvas.style.height = height + 'px'
+    canvas.width = width * ratio
+    canvas.height = height * ratio
+    const ctx = canvas.getContext('2d')
+    ctx.scale(ratio, ratio)
+    ctx.font = '12px sans-serif'
+    return { ctx, width, height }
+  },
+
+  // Linear scales from data space into the plot area
+  scales: function (width, height, xMin, xMax, yMin, yMax) {
+    const m = this.margin
+    const xSpan = xMax - xMin || 1
+    const ySpan = yMax - yMin || 1
+    return {
+      x: (v) => m.left + ((v - xMin) / xSpan) * (width - m.left - m.right),
+      y: (v) => height - m.bottom - ((v - yMin) / ySpan) * (height - m.top - m.bottom),
+    }
+  },
+
+  drawAxes: function (ctx, width, height, xMin, xMax, yMin, yMax, xLabel) {
+    const m = this.margin
+    const s = this.scales(width, height, xMin, xMax, yMin, yMax)
+    ctx.strokeStyle = '#999'
+    ctx.fillStyle = '#333'
+    ctx.strokeRect(m.left, m.top, width - m.left - m.right, height - m.top - m.bottom)
+
+    ctx.textAlign = 'right'
+    ctx.textBaseline = 'middle'
+    for (let i = 0; i <= 4; i++) {
+      const v = yMin + ((yMax - yMin) * i) / 4
+      ctx.fillText(v.toFixed(3), m.left - 5, s.y(v))
+    }
+    ctx.textAlign = 'center'
+    ctx.textBaseline = 'top'
+    for (let i = 0; i <= 5; i++) {
+      const v = xMin + ((xMax - xMin) * i) / 5
+      ctx.fillText(Math.round(v), s.x(v), height - m.bottom + 5)
+    }
+    ctx.fillText(xLabel, (m.left + width - m.right) / 2, height - 15)
+    return s
+  },
+
+  drawMetric: function (canvas, series, baseline, target) {
+    const { ctx, width, height } = this.setup(canvas, 320)
+    const epochs = this.decode(series.metric_epochs)
+    const values = this.decode(series.P_series)
+    const [low, high] = this.extent(values)
+    const yMin = Math.min(baseline, target, low)
+    const yMax = Math.max(baseline, target, high)
+    const s = this.drawAxes(ctx, width, height, epochs[0], epochs[epochs.length - 1], yMin, yMax, 'Epoch')
+
+    const hline = (v, color, dash) => {
+      ctx.strokeStyle = color
+      ctx.setLineDash(dash)
+      ctx.beginPath()
+      ctx.moveTo(s.x(epochs[0]), s.y(v))
+      ctx.lineTo(s.x(epochs[epochs.length - 1]), s.y(v))
+      ctx.stroke()
+      ctx.setLineDash([])
+    }
+    hline(target, 'red', [6, 4])
+    hline(baseline, 'gray', [2, 3])
+
+    ctx.strokeStyle = this.colors[0]
+    ctx.lineWidth = 2
+    ctx.beginPath()
+    values.forEach((v, i) => (i ? ctx.lineTo : ctx.moveTo).call(ctx, s.x(epochs[i]), s.y(v)))
+    ctx.stroke()
+    ctx.lineWidth = 1
+  },
+
+  // One stacked area chart of strategy shares per actor
+  drawShares: function (container, series) {
+    const epochs = this.decode(series.epochs)
+    const share = this.decode(series.share)
+    const K = series.strategies
+    const T = epochs.length
+
+    series.sector_names.forEach((name, g) => {
+      const canvas = this.panel(container, `${name} - Strategy Shares`)
+      const { ctx, width, height } = this.setup(canvas, 160)
+      const s = this.drawAxes(ctx, width, height, epochs[0], epochs[T - 1], 0, 1, 'Epoch')
+      const lower = new Float32Array(T)
+
+      for (let k = 0; k < K; k++) {
+        const offset = (g * K + k) * T
+        const upper = lower.map((v, t) => v + share[offset + t])
+        ctx.fillStyle = this.colors[k % this.colors.length]
+        ctx.globalAlpha = 0.7
+        ctx.beginPath()
+        for (let t = 0; t < T; t++) ctx.lineTo(s.x(epochs[t]), s.y(upper[t]))
+        for (let t = T - 1; t >= 0; t--) ctx.lineTo(s.x(epochs[t]), s.y(lower[t]))
+        ctx.fill()
+        ctx.globalAlpha = 1
+        lower.set(upper)
+      }
+    })
+  },
+
+  // One payoff heatmap per actor: strategies on the y axis, epochs on the x axis
+  drawPayoffs: function (container, series) {
+    const epochs = this.decode(series.epochs)
+    const payoff = this.decode(series.payoff)
+    const K = series.strategies
+    const T = epochs.length
+
+    series.sector_names.forEach((name, g) => {
+      const canvas = this.panel(container, name)
+      const { ctx, width, height } = this.setup(canvas, 40 * K + 55)
+      const values = payoff.subarray(g * K * T, (g + 1) * K * T)
+      const [min, max] = this.extent(values)
+      const s = this.drawAxes(ctx, width, height, 0, T, 0, K, 'Recorded epoch')
+      const cellWidth = s.x(1) - s.x(0)
+
+      for (let k = 0; k < K; k++) {
+        for (let t = 0; t < T; t++) {
+          const level = max > min ? (values[k * T + t] - min) / (max - min) : 0.5
+          ctx.fillStyle = this.viridis(level)
+          ctx.fillRect(s.x(t), s.y(k + 1), cellWidth + 0.5, s.y(k) - s.y(k + 1))
+        }
+      }
+    })
+  },
+
+  // Coarse viridis approximation for level in [0, 1]
+  viridis: function (level) {
+    const stops = [
+      [68, 1, 84],
+      [59, 82, 139],
+      [33, 145, 140],
+      [94, 201, 98],
+      [253, 231, 37],
+    ]
+    const position = level * (stops.length - 1)
+    const i = Math.min(Math.floor(position), stops.length - 2)
+    const f = position - i
+    const c = stops[i].map((v, j) => Math.round(v + (stops[i + 1][j] - v) * f))
+    return `rgb(${c[0]}, ${c[1]}, ${c[2]})`
+  },
+
+  panel: function (container, title) {
+    const heading = document.createElement('h5')
+    heading.textContent = title
+    const canvas = document.createElement('canvas')
+    canvas.className = 'simulation-plot'
+    container.append(heading, canvas)
+    return canvas
+  },
+
+  init: function () {
+    const data = document.getElementById('simulationSeries')
+    if (!data) return
+
+    const results = JSON.parse(data.textContent)
+    const params = results.simulation_params
+    SimulationCharts.drawMetric(
+      document.getElementById('metricChart'),
+      results.series,
+      params.P_baseline,
+      params.P_target
+    )
+    SimulationCharts.drawShares(document.getElementById('sharesCharts'), results.series)
+    SimulationCharts.drawPayoffs(document.getElementById('payoffsCharts'), results.series)
+  },
+}
+
+// Initialize when DOM loads
+document.addEventListener('DOMContentLoaded', SimulationCharts.init)
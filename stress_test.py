@@ -0,0 +1,170 @@
+"""
+stress_test.py
+Monte Carlo stress-tests from Stage 10 of math_algo.md: re-run the simulation
+on landscapes whose Δ-effects, costs and weights carry ± noise, and summarise
+how often (and how quickly) the target is still reached.
+
+Draws are simulated in vectorised chunks across a process pool. Each chunk
+reports only `t_hit` and the final headline metric per draw, so per-epoch
+histories are never materialised.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from simulation import LEARNING_RATE, parse_rows_to_arrays, simulate_batch_arrays
+
+# Constants
+PAYOFF_EPSILON = 1e-4  # same payoff floor as maths/calculate_payoffs.py
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+class StressTestSummary(BaseModel):
+    n_draws: int = Field(description="Number of perturbed landscapes simulated so far")
+    hits: int = Field(description="Number of draws that reached the target")
+    hit_probability: float = Field(description="Share of draws that reached the target")
+    t_hit_counts: List[int] = Field(description="Number of draws hitting the target at each epoch")
+    t_hit_quantiles: Dict[float, Optional[float]] = Field(description="Quantiles of t_hit over the draws that hit")
+    final_P_mean: float = Field(description="Mean headline metric at the end of each draw")
+    final_P_quantiles: Dict[float, float] = Field(description="Quantiles of the final headline metric")
+
+
+def perturb_landscape(rng: np.random.Generator, n_draws: int, delta_raw: np.ndarray, private_cost: np.ndarray,
+                      weight: np.ndarray, payoff_base: np.ndarray, delta_noise: float = 0.1,
+                      cost_noise: float = 0.1, weight_noise: float = 0.1):
+    """
+    Draw `n_draws` perturbed copies of a (G, K) landscape.
+
+    Each Δ-effect, cost and weight is scaled by an independent factor drawn
+    uniformly from 1 ± noise. Base payoffs move by the change in
+    weight * (-delta) - cost, floored at PAYOFF_EPSILON. Only cells whose
+    payoff actually moved are floored, so a zero-noise draw reproduces
+    `payoff_base` exactly, and the zero padding of ragged landscapes stays zero.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        (delta_raw, payoff_base), each of shape (n_draws, G, K)
+    """
+    shape = (n_draws,) + delta_raw.shape
+    delta_draw = delta_raw * rng.uniform(1 - delta_noise, 1 + delta_noise, shape)
+    cost_draw = private_cost * rng.uniform(1 - cost_noise, 1 + cost_noise, shape)
+    weight_draw = weight * rng.uniform(1 - weight_noise, 1 + weight_noise, shape)
+
+    raw_payoff = weight * (-delta_raw) - private_cost
+    raw_payoff_draw = weight_draw * (-delta_draw) - cost_draw
+    change = raw_payoff_draw - raw_payoff
+    payoff_draw = np.where(change != 0, np.maximum(payoff_base + change, PAYOFF_EPSILON), payoff_base)
+
+    return delta_draw, payoff_draw
+
+
+def _simulate_chunk(seed: np.random.SeedSequence, n_draws: int, landscape: tuple, P_baseline: float,
+                    P_target: float, max_epochs: int, learning_rate: float, noise: tuple):
+    """Simulate one chunk of draws; runs inside a worker process."""
+    delta_raw, private_cost, weight, payoff_base, initial_shares = landscape
+    rng = np.random.default_rng(seed)
+    delta_draw, payoff_draw = perturb_landscape(rng, n_draws, delta_raw, private_cost, weight, payoff_base, *noise)
+
+    result = simulate_batch_arrays(delta_draw, payoff_draw, initial_shares, P_baseline, P_target,
+                                   max_epochs, learning_rate, record_series=False)
+    return result.t_hit, result.final_P
+
+
+def _summarise(t_hits: List[np.ndarray], final_Ps: List[np.ndarray], max_epochs: int,
+               quantiles: Sequence[float]) -> StressTestSummary:
+    t_hit = np.concatenate(t_hits)
+    final_P = np.concatenate(final_Ps)
+    hit_epochs = t_hit[t_hit >= 0]
+
+    if hit_epochs.size:
+        t_hit_quantiles = dict(zip(quantiles, np.quantile(hit_epochs, quantiles).tolist()))
+    else:
+        t_hit_quantiles = {q: None for q in quantiles}
+
+    return StressTestSummary(
+        n_draws=int(t_hit.size),
+        hits=int(hit_epochs.size),
+        hit_probability=float(hit_epochs.size / t_hit.size),
+        t_hit_counts=np.bincount(hit_epochs, minlength=max_epochs).tolist(),
+        t_hit_quantiles=t_hit_quantiles,
+        final_P_mean=float(final_P.mean()),
+        final_P_quantiles=dict(zip(quantiles, np.quantile(final_P, quantiles).tolist()))
+    )
+
+
+def iter_stress_test(rows: List[List], P_baseline: float, P_target: float, max_epochs: int,
+                     n_draws: int = 100_000, delta_noise: float = 0.1, cost_noise: float = 0.1,
+                     weight_noise: float = 0.1, learning_rate: float = LEARNING_RATE,
+                     seed: Optional[int] = None, chunk_size: int = 5_000, workers: Optional[int] = None,
+                     quantiles: Sequence[float] = DEFAULT_QUANTILES) -> Iterator[StressTestSummary]:
+    """
+    Run a Monte Carlo stress-test and yield a running summary as each chunk finishes.
+
+    Parameters
+    ----------
+    rows : List[List]
+        Landscape rows, as accepted by `run_simulation`.
+    n_draws : int
+        Number of perturbed landscapes to simulate.
+    delta_noise, cost_noise, weight_noise : float
+        Relative noise amplitude (0.1 = ±10 %) for each input.
+    seed : int, optional
+        Seed for the generator; the same seed gives the same final summary
+        regardless of `workers` or the order chunks complete in.
+    chunk_size : int
+        Draws simulated together in one vectorised batch.
+    workers : int, optional
+        Process pool size; defaults to the CPU count. 1 runs in-process.
+
+    Yields
+    ------
+    StressTestSummary
+        Cumulative statistics over every chunk completed so far.
+    """
+    if not rows:
+        raise ValueError("No data provided for stress test")
+    if n_draws < 1:
+        raise ValueError("n_draws must be at least 1")
+
+    delta_raw, private_cost, weight, payoff_base, initial_shares, _, _ = parse_rows_to_arrays(rows)
+    landscape = (delta_raw, private_cost, weight, payoff_base, initial_shares)
+    noise = (delta_noise, cost_noise, weight_noise)
+
+    # One independent child seed per chunk keeps results reproducible across pool sizes
+    chunk_sizes = [min(chunk_size, n_draws - start) for start in range(0, n_draws, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    tasks = [(chunk_seed, size, landscape, P_baseline, P_target, max_epochs, learning_rate, noise)
+             for chunk_seed, size in zip(seeds, chunk_sizes)]
+
+    t_hits, final_Ps = [], []
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+
+    if workers == 1:
+        for task in tasks:
+            t_hit, final_P = _simulate_chunk(*task)
+            t_hits.append(t_hit)
+            final_Ps.append(final_P)
+            yield _summarise(t_hits, final_Ps, max_epochs, quantiles)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_simulate_chunk, *task) for task in tasks]
+        for future in as_completed(futures):
+            t_hit, final_P = future.result()
+            t_hits.append(t_hit)
+            final_Ps.append(final_P)
+            yield _summarise(t_hits, final_Ps, max_epochs, quantiles)
+
+
+def run_stress_test(rows: List[List], P_baseline: float, P_target: float, max_epochs: int,
+                    **kwargs) -> StressTestSummary:
+    """Run a Monte Carlo stress-test to completion and return the final summary."""
+    summary = None
+    for summary in iter_stress_test(rows, P_baseline, P_target, max_epochs, **kwargs):
+        pass
+    return summary
@@ -0,0 +1,32 @@
+"""
+conftest.py
+Fixtures for running the LLM steps offline against FakeChatModel.
+"""
+
+import pytest
+
+from api.openai import llm_backend, llm_cache
+
+
+@pytest.fixture
+def fake_llm(monkeypatch, tmp_path):
+    """
+    Build every chat model on the fake backend, with an empty LLM cache in tmp_path.
+
+    Returns the list of tasks the model was called for, one entry per call
+    that reached the model (cache hits add nothing).
+    """
+    monkeypatch.setattr(llm_backend, "LLM_BACKEND", "fake")
+    monkeypatch.setattr(llm_backend, "_shared", {})
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(llm_cache, "_cache", llm_cache.SQLiteLLMCache(str(tmp_path / "llm_cache.sqlite")))
+
+    calls = []
+    respond = llm_backend.FakeChatModel._respond
+
+    def counted(self, messages):
+        calls.append(self.task)
+        return respond(self, messages)
+
+    monkeypatch.setattr(llm_backend.FakeChatModel, "_respond", counted)
+    return calls
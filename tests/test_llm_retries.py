@@ -0,0 +1,62 @@
+"""
+test_llm_retries.py
+A reply that fails to parse is retried past the LLM cache, and the good reply
+replaces it there.
+"""
+
+import pytest
+
+from api.openai import llm_backend
+from api.openai.analyze_payoffs import analyze_payoffs
+from api.openai.infer_actors import infer_actors_from_problem
+from api.openai.infer_behavior_shares import infer_behavior_shares
+from benchmarks.landscapes import synthetic_actors
+from maths.calculate_payoffs import calculate_payoffs
+
+PROBLEM = "Child poverty in the UK"
+
+
+@pytest.fixture
+def malformed_first(fake_llm, monkeypatch):
+    """Truncate the first reply the fake model gives, as a cut-off completion would be."""
+    respond = llm_backend.FakeChatModel._respond
+    replies = []
+
+    def malformed(self, messages):
+        text = respond(self, messages)
+        replies.append(text)
+        return text[:len(text) // 2] if len(replies) == 1 else text
+
+    monkeypatch.setattr(llm_backend.FakeChatModel, "_respond", malformed)
+    return fake_llm
+
+
+def test_actors_retry_past_malformed_reply(malformed_first):
+    table = infer_actors_from_problem(PROBLEM)
+
+    assert table is not None and len(table.actors) >= 6
+    assert malformed_first == ["actors", "actors"]
+    # The retry's reply replaced the bad one in the cache
+    assert infer_actors_from_problem(PROBLEM) == table
+    assert len(malformed_first) == 2
+
+
+def test_behavior_shares_retry_past_malformed_reply(malformed_first):
+    actors = calculate_payoffs(synthetic_actors(3))
+
+    result = infer_behavior_shares(PROBLEM, actors)
+
+    assert malformed_first == ["behavior_shares", "behavior_shares"]
+    assert all(strategy.behavior_share_epoch_0 is not None for actor in result for strategy in actor.strategies)
+    assert infer_behavior_shares(PROBLEM, actors) == result
+    assert len(malformed_first) == 2
+
+
+def test_analysis_retry_past_malformed_reply(malformed_first):
+    actors = calculate_payoffs(synthetic_actors(3))
+
+    analysis = analyze_payoffs(PROBLEM, actors)
+
+    assert malformed_first == ["payoff_analysis", "payoff_analysis"]
+    assert analyze_payoffs(PROBLEM, actors) == analysis
+    assert len(malformed_first) == 2
@@ -0,0 +1,28 @@
+"""
+test_payoffs_cache.py
+Streamed payoffs are written to the LLM cache, so a repeated run needs no model calls.
+"""
+
+from api.openai.infer_actors import infer_actors_from_problem
+from api.openai.pipeline import infer_landscape, iter_landscape
+
+PROBLEM = "Child poverty in the UK"
+OBJECTIVE = "Children in relative poverty"
+
+
+def test_repeated_landscape_makes_no_model_calls(fake_llm):
+    actors = [actor.model_dump() for actor in infer_actors_from_problem(PROBLEM).actors]
+    fake_llm.clear()
+
+    first = infer_landscape(PROBLEM, actors, OBJECTIVE)
+    assert first and "payoffs" in fake_llm
+    fake_llm.clear()
+
+    events = list(iter_landscape(PROBLEM, actors, OBJECTIVE))
+
+    assert fake_llm == []
+    assert events[-1]["stage"] == "complete"
+    assert events[-1]["actors"] == first
+    # Cached chunks still report their rows one by one (chunks finish in any order)
+    rows = [event["actors"][0] for event in events if event["stage"] == "payoff_row"]
+    assert sorted(actor.actor_id for actor in rows) == sorted(actor["actor_id"] for actor in actors)
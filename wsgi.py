@@ -0,0 +1,70 @@
+"""
+wsgi.py
+Production entry point: the Flask app for a pre-forking WSGI server.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+`main.py`'s `__main__` block (Flask's development server plus a browser
+window) is for local use only. Under gunicorn the app is imported once in the
+master and the workers are forked from it. `main` imports the LLM modules
+lazily, so this module imports them up front (PRELOAD_MODULES) and the forked
+workers share them. Each worker then calls `warm_up` before taking requests,
+so the first real request does not pay for NumPy kernel dispatch, the LLM
+cache connection or for building the shared LLM clients and chains.
+
+Sessions default to the SQLite store (SESSION_BACKEND=sqlite) when the app is
+served from here, so they survive requests landing on different workers.
+"""
+
+import importlib
+import logging
+import os
+
+# Before `main` reads config: a multi-process server needs sessions every worker can see
+os.environ.setdefault("SESSION_BACKEND", "sqlite")
+
+from main import app
+from simulation import run_simulation
+
+logger = logging.getLogger(__name__)
+
+# Feature modules `main` only imports on first use; a long-running server wants them loaded before forking
+PRELOAD_MODULES = (
+    "api.openai.pipeline",
+    "api.openai.infer_actors",
+    "api.openai.infer_outcome_target",
+    "api.openai.infer_payoffs",
+    "api.openai.infer_behavior_shares",
+    "api.openai.analyze_payoffs",
+)
+
+# A tiny two-actor landscape in /simulate row format, only used to exercise the kernel
+_WARM_UP_ROWS = [
+    [sector, f"{code}-{k + 1}", level, delta, cost, 0.5, 0.1, 1 / 3, "warm-up"]
+    for sector, code in (("Sector A", "SA"), ("Sector B", "SB"))
+    for k, (level, delta, cost) in enumerate((("High", -2.0, 0.6), ("Medium", -1.0, 0.3), ("Low", -0.2, 0.1)))
+]
+
+
+def preload_modules() -> None:
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
+
+
+def warm_up() -> None:
+    """Pay one-off startup costs in this process. Failures are logged, never raised."""
+    try:
+        run_simulation(_WARM_UP_ROWS, 100.0, 85.0, max_epochs=5, record="summary")
+    except Exception:
+        logger.exception("Simulation warm-up failed")
+
+    try:
+        from api.openai import pipeline
+        from api.openai.llm_cache import get_llm_cache
+        get_llm_cache()
+        pipeline.warm_up()
+    except Exception:
+        logger.exception("LLM client warm-up failed")
+
+
+preload_modules()